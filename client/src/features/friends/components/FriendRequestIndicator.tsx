@@ -1,19 +1,12 @@
-import React, { useEffect } from 'react'
+import React from 'react'
 import { Users } from 'lucide-react'
 import { Link } from 'react-router-dom'
-import { useDispatch, useSelector } from 'react-redux'
-import { fetchPendingRequests } from '../redux/friendsSlice'
-import { RootState } from '../../../redux/store'
+import { useFriendshipCounts } from '../../../services/friendsService'
 
 const FriendRequestIndicator: React.FC = () => {
-    const dispatch = useDispatch()
-    const { pendingRequests } = useSelector((state: RootState) => state.friends)
+    const { data: counts } = useFriendshipCounts()
 
-    useEffect(() => {
-        dispatch(fetchPendingRequests())
-    }, [dispatch])
-
-    const requestCount = pendingRequests?.length || 0
+    const requestCount = counts?.pending_received || 0
 
     return (
         <Link
@@ -1,5 +1,6 @@
 import { createSlice, createAsyncThunk, PayloadAction } from '@reduxjs/toolkit';
 import { friendsApi } from '../../../services/api';
+import { fetchAllFriendRequests, fetchAllFriendships } from '../../../services/friendsService';
 
 export interface Friendship {
     id: number;
@@ -33,8 +34,7 @@ export const fetchFriendships = createAsyncThunk(
     'friends/fetchFriendships',
     async (_, { rejectWithValue }) => {
         try {
-            const response = await friendsApi.get<Friendship[]>('');
-            return response.data;
+            return await fetchAllFriendships();
         } catch (error: any) {
             return rejectWithValue(error.response?.data?.detail || 'Failed to fetch friendships');
         }
@@ -45,8 +45,7 @@ export const fetchPendingRequests = createAsyncThunk(
     'friends/fetchPendingRequests',
     async (_, { rejectWithValue }) => {
         try {
-            const response = await friendsApi.get<Friendship[]>('pending');
-            return response.data;
+            return await fetchAllFriendships('pending');
         } catch (error: any) {
             return rejectWithValue(error.response?.data?.detail || 'Failed to fetch pending requests');
         }
@@ -57,11 +56,7 @@ export const fetchFriendRequests = createAsyncThunk(
     'friends/fetchFriendRequests',
     async (_, { rejectWithValue }) => {
         try {
-            const response = await friendsApi.get<{
-                sentRequests: Friendship[];
-                receivedRequests: Friendship[];
-            }>('/requests');
-            return response.data;
+            return await fetchAllFriendRequests();
         } catch (error: any) {
             return rejectWithValue(error.response?.data?.detail || 'Failed to fetch friend requests');
         }
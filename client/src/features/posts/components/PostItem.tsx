@@ -16,6 +16,7 @@ import {
     useLikePost,
 } from '../../../services/postsService'
 import { useQueryClient } from '@tanstack/react-query'
+import { usePostSubscription } from '../../../services/websocketService'
 
 interface PostItemProps {
     post: Post
@@ -30,6 +31,7 @@ const PostItem = ({ post, currentUser, imageBaseUrl }: PostItemProps) => {
     const likeMutation = useLikePost()
     const addCommentMutation = useAddComment()
     const queryClient = useQueryClient()
+    usePostSubscription(post.id, post.user_id)
 
     // Get pending states for improved UI feedback
     const pendingLikes =
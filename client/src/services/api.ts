@@ -125,4 +125,25 @@ export const deleteData = async <T>(
     };
     const response = await apiInstance.delete<T>(endpoint, finalConfig);
     return response.data;
-};
\ No newline at end of file
+};
+
+// GET every page of a keyset-paginated list by following the X-Next-Cursor header
+export const fetchAllPages = async <T>(
+    apiInstance: typeof authApi | typeof postsApi | typeof friendsApi,
+    endpoint: string,
+    merge: (all: T, page: T) => T,
+    config?: AxiosRequestConfig
+): Promise<T> => {
+    let all: T | undefined;
+    let cursor: string | undefined;
+    do {
+        const response = await apiInstance.get<T>(endpoint, {
+            ...config,
+            withCredentials: true,
+            params: { ...config?.params, ...(cursor ? { cursor } : {}) },
+        });
+        all = all === undefined ? response.data : merge(all, response.data);
+        cursor = response.headers['x-next-cursor'];
+    } while (cursor);
+    return all as T;
+};
@@ -1,5 +1,5 @@
 import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
-import { friendsApi } from './api';
+import { fetchAllPages, friendsApi } from './api';
 import { queryInvalidator } from './queryInvalidator';
 
 export interface Friendship {
@@ -21,14 +21,26 @@ export interface FriendshipStatusUpdate {
     status: 'accepted' | 'rejected';
 }
 
+export interface FriendRequests {
+    sentRequests: Friendship[];
+    receivedRequests: Friendship[];
+}
+
+// Friendship lists are paginated server-side; these follow the cursor to the end
+export const fetchAllFriendships = (endpoint = '') =>
+    fetchAllPages<Friendship[]>(friendsApi, endpoint, (all, page) => [...all, ...page]);
+
+export const fetchAllFriendRequests = () =>
+    fetchAllPages<FriendRequests>(friendsApi, '/requests', (all, page) => ({
+        sentRequests: [...all.sentRequests, ...page.sentRequests],
+        receivedRequests: [...all.receivedRequests, ...page.receivedRequests],
+    }));
+
 // Get all user friendships
 export const useFriendships = () => {
     return useQuery({
         queryKey: ['friendships'],
-        queryFn: async () => {
-            const response = await friendsApi.get<Friendship[]>('');
-            return response.data;
-        },
+        queryFn: () => fetchAllFriendships(),
     });
 };
 
@@ -38,9 +50,48 @@ export const usePendingFriendRequests = () => {
         queryKey: ['friendRequests', 'pending'],
         queryFn: async () => {
             // Fix: Use the correct endpoint structure
-            const response = await friendsApi.get<Friendship[]>('pending');
+            return fetchAllFriendships('pending');
+        },
+    });
+};
+
+export interface FriendshipCounts {
+    pending_received: number;
+    pending_sent: number;
+    friends: number;
+}
+
+// Get pending/accepted counts for notification badges
+export const useFriendshipCounts = () => {
+    return useQuery({
+        queryKey: ['friendRequests', 'counts'],
+        queryFn: async () => {
+            const response = await friendsApi.get<FriendshipCounts>('counts');
+            return response.data;
+        },
+        staleTime: 10 * 1000,
+        refetchInterval: 30 * 1000,
+    });
+};
+
+export interface MutualFriends {
+    user_id: number;
+    mutual_count: number;
+    mutual_ids: number[];
+}
+
+// Get mutual friend counts for one or many users in a single call
+export const useMutualFriends = (userIds: number[], includeIds = 0) => {
+    return useQuery({
+        queryKey: ['mutualFriends', [...userIds].sort((a, b) => a - b), includeIds],
+        queryFn: async () => {
+            const params = new URLSearchParams();
+            userIds.forEach((id) => params.append('user_ids', String(id)));
+            params.append('include_ids', String(includeIds));
+            const response = await friendsApi.get<MutualFriends[]>('mutual', { params });
             return response.data;
         },
+        enabled: userIds.length > 0,
     });
 };
 
@@ -51,12 +102,9 @@ export const useFriendRequests = () => {
         queryFn: async () => {
             console.log('Fetching friend requests from:', '/requests');
             try {
-                const response = await friendsApi.get<{
-                    sentRequests: Friendship[];
-                    receivedRequests: Friendship[];
-                }>('/requests');
-                console.log('Received Response from:', '/requests', response.status);
-                return response.data;
+                const requests = await fetchAllFriendRequests();
+                console.log('Received Response from:', '/requests');
+                return requests;
             } catch (error) {
                 console.error('Error fetching friend requests:', error);
                 throw error;
@@ -126,8 +174,7 @@ export const useFriendshipStatus = (userId: number) => {
     return useQuery({
         queryKey: ['friendshipStatus', userId],
         queryFn: async () => {
-            const response = await friendsApi.get<Friendship[]>('');
-            const friendships = response.data;
+            const friendships = await fetchAllFriendships();
 
             // Find any friendship with the specified user
             const friendship = friendships.find(f =>
@@ -1,4 +1,5 @@
 import { io, Socket } from 'socket.io-client';
+import { decode } from '@msgpack/msgpack';
 import { useEffect, useState } from 'react';
 import { useQueryClient } from '@tanstack/react-query';
 import { useDispatch } from 'react-redux';
@@ -12,21 +13,117 @@ export enum SocketEvents {
     POST_LIKED = 'post_liked',
     NEW_COMMENT = 'new_comment',
     NEW_FRIEND_REQUEST = 'new_friend_request',
-    FRIEND_REQUEST_ACCEPTED = 'friend_request_accepted'
+    FRIEND_REQUEST_ACCEPTED = 'friend_request_accepted',
+    REPLAY = 'replay',
+    RESYNC_REQUIRED = 'resync_required'
 }
 
 // Socket.io client instance
 let socket: Socket | null = null;
 
+// Opt-in compact payloads: the server packs these events as msgpack arrays in
+// this field order (EVENT_SCHEMAS in the websocket service's codec.py)
+const wsEncoding = import.meta.env.VITE_WS_ENCODING === 'msgpack' ? 'msgpack' : 'json';
+
+const EVENT_SCHEMAS: Record<string, string[]> = {
+    [SocketEvents.NEW_POST]: ['seq', 'id', 'user_id', 'username', 'image_url', 'caption', 'is_private', 'likes_count', 'created_at'],
+    [SocketEvents.POST_LIKED]: ['postId', 'likes', 'userHasLiked'],
+    [SocketEvents.NEW_COMMENT]: ['postId', 'comment', 'newComments'],
+    [SocketEvents.NEW_FRIEND_REQUEST]: ['seq', 'requesterId'],
+    [SocketEvents.FRIEND_REQUEST_ACCEPTED]: ['seq', 'addresseeId'],
+};
+
+// Binary payloads are msgpack arrays, anything else is already an object
+const decodePayload = (event: string, payload: any): any => {
+    if (!(payload instanceof ArrayBuffer || ArrayBuffer.isView(payload))) return payload;
+    const values = decode(payload) as unknown[];
+    const fields = EVENT_SCHEMAS[event] ?? [];
+    return Object.fromEntries(
+        fields
+            .map((field, index) => [field, values[index]])
+            .filter(([, value]) => value !== null && value !== undefined)
+    );
+};
+
+// Highest sequence number seen on a targeted event. Sent on (re)connect so
+// the server can replay what was missed instead of the client refetching
+let lastSeq = 0;
+
+const trackSeq = (data: any): void => {
+    if (typeof data?.seq === 'number' && data.seq > lastSeq) lastSeq = data.seq;
+};
+
+// Posts on screen, keyed by post id -> { authorId, refs }. The server only
+// sends likes/comments for subscribed posts, so this is replayed on reconnect
+const postSubscriptions = new Map<number, { authorId: number; refs: number }>();
+
+const toSubscription = (postId: number, authorId: number) => ({ postId, authorId });
+
+const resubscribePosts = (): void => {
+    if (!socket || postSubscriptions.size === 0) return;
+    socket.emit('subscribe_posts', {
+        posts: Array.from(postSubscriptions, ([postId, { authorId }]) =>
+            toSubscription(postId, authorId)
+        ),
+    });
+};
+
+export const subscribePost = (postId: number, authorId: number): void => {
+    const existing = postSubscriptions.get(postId);
+    if (existing) {
+        existing.refs += 1;
+        return;
+    }
+    postSubscriptions.set(postId, { authorId, refs: 1 });
+    socket?.emit('subscribe_posts', { posts: [toSubscription(postId, authorId)] });
+};
+
+export const unsubscribePost = (postId: number): void => {
+    const existing = postSubscriptions.get(postId);
+    if (!existing) return;
+    existing.refs -= 1;
+    if (existing.refs > 0) return;
+    postSubscriptions.delete(postId);
+    socket?.emit('unsubscribe_posts', {
+        posts: [toSubscription(postId, existing.authorId)],
+    });
+};
+
+// Subscribe to live like/comment updates for a post while it is rendered
+export const usePostSubscription = (postId: number, authorId: number) => {
+    useEffect(() => {
+        subscribePost(postId, authorId);
+        return () => unsubscribePost(postId);
+    }, [postId, authorId]);
+};
+
 // Initialize WebSocket connection
 export const initializeSocket = (token: string): Socket => {
     if (socket) return socket;
 
     socket = io(import.meta.env.VITE_WS_URL || 'http://localhost:8080', {
-        auth: { token },
+        // Evaluated on every connection attempt, so reconnects carry lastSeq
+        auth: (cb) =>
+            cb({
+                token,
+                ...(lastSeq ? { last_seq: lastSeq } : {}),
+                ...(wsEncoding === 'msgpack' ? { encoding: 'msgpack' } : {}),
+            }),
         transports: ['websocket'],
         autoConnect: true,
     });
+    // Emits before the first connect are buffered; a reconnect needs a replay
+    socket.io.on('reconnect', resubscribePosts);
+
+    // Refused by admission control - socket.io won't retry on its own, so
+    // come back after the server's hint plus some jitter
+    socket.on('connect_error', (err: any) => {
+        const retryAfter = err?.data?.retryAfter;
+        if (typeof retryAfter !== 'number') return;
+        setTimeout(() => {
+            if (socket && !socket.connected) socket.connect();
+        }, (retryAfter + Math.random()) * 1000);
+    });
 
     return socket;
 };
@@ -61,20 +158,53 @@ export const useSocket = (token: string | null) => {
             console.log('WebSocket disconnected');
         });
 
-        // Post events
-        socket.on(SocketEvents.NEW_POST, () => {
-            // Invalidate posts query to refetch with new data
+        // Events sent to the user's room carry a seq and can be replayed
+        const targetedHandlers: Record<string, (data: any) => void> = {
+            [SocketEvents.NEW_POST]: () => {
+                // Invalidate posts query to refetch with new data
+                queryClient.invalidateQueries({ queryKey: ['posts'] });
+            },
+            [SocketEvents.NEW_FRIEND_REQUEST]: () => {
+                queryClient.invalidateQueries({ queryKey: ['friendRequests'] });
+            },
+            [SocketEvents.FRIEND_REQUEST_ACCEPTED]: () => {
+                queryClient.invalidateQueries({ queryKey: ['friends'] });
+                queryClient.invalidateQueries({ queryKey: ['friendRequests'] });
+            },
+        };
+
+        Object.entries(targetedHandlers).forEach(([event, handler]) => {
+            socket.on(event, (payload) => {
+                const data = decodePayload(event, payload);
+                trackSeq(data);
+                handler(data);
+            });
+        });
+
+        socket.on(SocketEvents.REPLAY, ({ events }) => {
+            events.forEach(({ event, data }: { event: string; data: any }) => {
+                trackSeq(data);
+                targetedHandlers[event]?.(data);
+            });
+        });
+
+        socket.on(SocketEvents.RESYNC_REQUIRED, () => {
+            // Too much was missed to replay - fall back to refetching
             queryClient.invalidateQueries({ queryKey: ['posts'] });
+            queryClient.invalidateQueries({ queryKey: ['friends'] });
+            queryClient.invalidateQueries({ queryKey: ['friendRequests'] });
         });
 
-        socket.on(SocketEvents.POST_LIKED, (data) => {
-            // Update post in cache directly
+        // Post events (only for subscribed posts)
+        socket.on(SocketEvents.POST_LIKED, (payload) => {
+            const data = decodePayload(SocketEvents.POST_LIKED, payload);
+            // Update the count in cache directly; sent on likes and unlikes by
+            // anyone, so our own userHasLiked is left as it is
             queryClient.setQueryData(['post', data.postId], (old: any) => {
                 if (!old) return old;
                 return {
                     ...old,
-                    likes: data.likes,
-                    userHasLiked: data.userHasLiked
+                    likes: data.likes
                 };
             });
 
@@ -82,22 +212,13 @@ export const useSocket = (token: string | null) => {
             queryClient.invalidateQueries({ queryKey: ['posts'] });
         });
 
-        socket.on(SocketEvents.NEW_COMMENT, (data) => {
+        socket.on(SocketEvents.NEW_COMMENT, (payload) => {
+            const data = decodePayload(SocketEvents.NEW_COMMENT, payload);
             // Similar to likes, update the post with new comment
             queryClient.invalidateQueries({ queryKey: ['post', data.postId] });
             queryClient.invalidateQueries({ queryKey: ['posts'] });
         });
 
-        // Friend events
-        socket.on(SocketEvents.NEW_FRIEND_REQUEST, () => {
-            queryClient.invalidateQueries({ queryKey: ['friendRequests'] });
-        });
-
-        socket.on(SocketEvents.FRIEND_REQUEST_ACCEPTED, () => {
-            queryClient.invalidateQueries({ queryKey: ['friends'] });
-            queryClient.invalidateQueries({ queryKey: ['friendRequests'] });
-        });
-
         return () => {
             // Clean up listeners when component unmounts
             socket.off(SocketEvents.CONNECT);
@@ -107,6 +228,8 @@ export const useSocket = (token: string | null) => {
             socket.off(SocketEvents.NEW_COMMENT);
             socket.off(SocketEvents.NEW_FRIEND_REQUEST);
             socket.off(SocketEvents.FRIEND_REQUEST_ACCEPTED);
+            socket.off(SocketEvents.REPLAY);
+            socket.off(SocketEvents.RESYNC_REQUIRED);
         };
     }, [token, queryClient, dispatch]);
 
@@ -18,6 +18,17 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
     
+    # Password hashing - bcrypt cost (hashes with another cost are upgraded on
+    # the next login) and the dedicated hashing pool; beyond max pending
+    # hashes, sign-ins get a 503 with Retry-After
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+    
+    # verify-token identity cache (active users by id)
+    IDENTITY_CACHE_MAX_SIZE: int = int(os.getenv("IDENTITY_CACHE_MAX_SIZE", "50000"))
+    IDENTITY_CACHE_TTL_SECONDS: int = int(os.getenv("IDENTITY_CACHE_TTL_SECONDS", "60"))
+    
     # Database
     POSTGRES_SERVER: str = os.getenv("POSTGRES_SERVER", "localhost")
     POSTGRES_USER: str = os.getenv("POSTGRES_USER", "postgres")
@@ -28,6 +39,12 @@ class Settings(BaseSettings):
         f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}/{POSTGRES_DB}"
     )
     
+    # Downstream services that cache user data and need invalidation
+    FRIENDSHIP_SERVICE_URL: str = os.getenv("FRIENDSHIP_SERVICE_URL", "http://localhost:8002")
+    
+    # Shared secret for service-to-service calls on /internal routes
+    INTERNAL_API_KEY: str = os.getenv("INTERNAL_API_KEY", "internal-api-key-please-change-in-production")
+    
     # First superuser
     FIRST_SUPERUSER_EMAIL: str = os.getenv("FIRST_SUPERUSER_EMAIL", "admin@example.com")
     FIRST_SUPERUSER_PASSWORD: str = os.getenv("FIRST_SUPERUSER_PASSWORD", "admin123")
@@ -0,0 +1,67 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.schemas.user import User as UserSchema
+
+
+class IdentityCache:
+    """
+    Active users by id, as returned by verify-token, with LRU eviction and a
+    TTL. Entries are dropped when a user changes their profile or is
+    deactivated; the TTL bounds staleness for changes made elsewhere (other
+    replicas, direct DB edits). Not thread-safe: only use it from the event
+    loop (async routes), never from a threadpool.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[int, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: int) -> Optional[UserSchema]:
+        entry = self._data.get(user_id)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self._data[user_id]
+            self.misses += 1
+            return None
+        self._data.move_to_end(user_id)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, user_id: int, identity: UserSchema) -> None:
+        self._data[user_id] = (identity, time.monotonic() + self.ttl_seconds)
+        self._data.move_to_end(user_id)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        if self._data.pop(int(user_id), None) is not None:
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+identity_cache = IdentityCache(
+    max_size=settings.IDENTITY_CACHE_MAX_SIZE,
+    ttl_seconds=settings.IDENTITY_CACHE_TTL_SECONDS,
+)
+
+
+def invalidate_identity(user_id: int) -> None:
+    identity_cache.invalidate(user_id)
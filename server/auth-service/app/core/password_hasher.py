@@ -0,0 +1,84 @@
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.core.security import pwd_context
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on its own small thread pool instead of Starlette's shared
+    one, so a burst of logins can't starve cheap requests like verify-token.
+    bcrypt releases the GIL, so threads hash in parallel. Once
+    max_pending hashes are queued or running, further requests are turned
+    away with a 503 and a Retry-After estimated from recent hash times.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._pending = 0
+        # Moving average of one hash, seeded with bcrypt's typical cost
+        self._avg_seconds = 0.25
+        self.completed = 0
+        self.shed = 0
+        self.rehashed = 0
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self._pending * self._avg_seconds / self.workers))
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self._pending >= self.max_pending:
+            self.shed += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-ins in progress, please retry shortly",
+                headers={"Retry-After": str(self._retry_after())},
+            )
+        self._pending += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+            self.completed += 1
+            self._avg_seconds = 0.9 * self._avg_seconds + 0.1 * (time.perf_counter() - started)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Check a password; if it matches but was hashed with other parameters
+        (e.g. BCRYPT_ROUNDS changed), also return a new hash to store
+        """
+        verified, new_hash = await self._run(pwd_context.verify_and_update, password, hashed_password)
+        if new_hash:
+            self.rehashed += 1
+        return verified, new_hash
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "avg_ms": round(self._avg_seconds * 1000, 1),
+            "completed": self.completed,
+            "shed": self.shed,
+            "rehashed": self.rehashed,
+        }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
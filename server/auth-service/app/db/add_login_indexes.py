@@ -0,0 +1,51 @@
+"""
+Script to add the case-insensitive unique indexes used by login.
+Run this script once to update the database schema (also run on startup).
+
+Accounts that already differ only by letter case would make the unique
+index fail; they are reported and that index is left out until they are
+resolved by hand, keeping a plain lower() index for lookups meanwhile.
+"""
+from sqlalchemy import text
+from app.db.session import engine
+
+# column -> (unique index, plain index from before it was unique)
+LOGIN_INDEXES = {
+    "email": ("ux_users_email_lower", "ix_users_email_lower"),
+    "username": ("ux_users_username_lower", "ix_users_username_lower"),
+}
+
+def find_case_collisions(connection, column: str):
+    """Groups of user ids whose values of column are equal ignoring case"""
+    rows = connection.execute(text(
+        f"SELECT lower({column}) AS value, array_agg(id ORDER BY id) AS ids "
+        f"FROM users GROUP BY lower({column}) HAVING count(*) > 1"
+    ))
+    return [(row.value, list(row.ids)) for row in rows]
+
+def add_login_indexes():
+    """Create the unique login indexes if they don't exist and nothing collides"""
+    with engine.begin() as connection:
+        try:
+            for column, (unique_index, plain_index) in LOGIN_INDEXES.items():
+                collisions = find_case_collisions(connection, column)
+                if collisions:
+                    for value, ids in collisions:
+                        print(f"Users {ids} share {column} {value!r} ignoring case")
+                    print(f"Skipping {unique_index} until these are resolved")
+                    # Login still needs an index on lower({column})
+                    connection.execute(text(
+                        f"CREATE INDEX IF NOT EXISTS {plain_index} ON users (lower({column}))"
+                    ))
+                    continue
+                connection.execute(text(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS {unique_index} ON users (lower({column}))"
+                ))
+                connection.execute(text(f"DROP INDEX IF EXISTS {plain_index}"))
+            print("Login indexes checked/added successfully!")
+        except Exception as e:
+            print(f"Error during migration: {e}")
+
+
+if __name__ == "__main__":
+    add_login_indexes()
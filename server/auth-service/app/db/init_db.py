@@ -3,10 +3,13 @@ from app.core.config import settings
 from app.db.session import SessionLocal, Base, engine
 from app.core.security import get_password_hash
 from app.models.user import User
+from app.db.add_login_indexes import add_login_indexes
 
 def init_db() -> None:
     # Create tables
     Base.metadata.create_all(bind=engine)
+    # Indexes added after the users table may already exist
+    add_login_indexes()
 
 def create_first_user() -> None:
     db = SessionLocal()
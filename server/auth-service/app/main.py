@@ -1,8 +1,9 @@
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.routes import auth, users
+from app.routes import auth, users, internal
 from app.db.init_db import init_db
+from app.core.password_hasher import password_hasher
 
 # Create FastAPI app
 app = FastAPI(title=settings.PROJECT_NAME)
@@ -21,12 +22,17 @@ app.add_middleware(
 # But move users under /api/auth directly (not nested)
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(users.router, prefix="/api/auth/users", tags=["users"]) 
+app.include_router(internal.router, prefix="/internal", tags=["internal"])
 
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
     init_db()  # init_db is synchronous, no await needed
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    password_hasher.shutdown()
+
 @app.get("/health", tags=["health"])
 def health_check():
     return {"status": "ok", "service": "auth-service"}
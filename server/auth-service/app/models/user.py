@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Index
 from sqlalchemy.sql import func
 from app.db.session import Base
 
@@ -14,4 +14,11 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    __table_args__ = (
+        # Case-insensitive login lookups; unique so "Alice" and "alice" can't
+        # both register (see db/add_login_indexes.py for older databases)
+        Index("ux_users_email_lower", func.lower(email), unique=True),
+        Index("ux_users_username_lower", func.lower(username), unique=True),
+    )
\ No newline at end of file
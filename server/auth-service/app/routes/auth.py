@@ -1,14 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Cookie, Request
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import case, func, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from jose import JWTError, jwt
 from datetime import timedelta
 from typing import Any, Optional
 
-from app.db.session import get_db
+from app.db.session import get_db, SessionLocal
 from app.core.config import settings
-from app.core.security import verify_password, create_access_token, get_password_hash
+from app.core.security import create_access_token
+from app.core.password_hasher import password_hasher
+from app.core.identity_cache import identity_cache
 from app.models.user import User
 from app.schemas.auth import Token, TokenData, LoginRequest
 from app.schemas.user import User as UserSchema, UserCreate
@@ -45,24 +50,29 @@ async def get_token(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(get_token)) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _decode_token(token: str) -> TokenData:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
-            raise credentials_exception
-        token_data = TokenData(sub=user_id)
+            raise _credentials_exception()
+        return TokenData(sub=user_id)
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+
+def get_current_user(db: Session = Depends(get_db), token: str = Depends(get_token)) -> User:
+    token_data = _decode_token(token)
     
     user = db.query(User).filter(User.id == token_data.sub).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
 
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
@@ -70,17 +80,74 @@ def get_current_active_user(current_user: User = Depends(get_current_user)) -> U
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+def _load_identity(user_id: int) -> Optional[UserSchema]:
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        return UserSchema.model_validate(user) if user is not None else None
+    finally:
+        db.close()
+
+async def get_verified_identity(token: str = Depends(get_token)) -> UserSchema:
+    """
+    Like get_current_active_user, but served from the identity cache: on a
+    hit verification is only the JWT check, with no session or query. Only
+    active users are cached.
+    """
+    token_data = _decode_token(token)
+    try:
+        user_id = int(token_data.sub)
+    except ValueError:
+        raise _credentials_exception()
+    
+    identity = identity_cache.get(user_id)
+    if identity is None:
+        identity = await run_in_threadpool(_load_identity, user_id)
+        if identity is None:
+            raise _credentials_exception()
+        if not identity.is_active:
+            raise HTTPException(status_code=400, detail="Inactive user")
+        identity_cache.set(user_id, identity)
+    return identity
+
+def _find_login_user(db: Session, login: str) -> Optional[User]:
+    """
+    Resolve an email or username, ignoring case, in one query. Exact matches
+    win, email before username, for accounts that differ only by case and
+    predate the unique lower() indexes.
+    """
+    login_lower = login.lower()
+    return (
+        db.query(User)
+        .filter(or_(func.lower(User.email) == login_lower, func.lower(User.username) == login_lower))
+        .order_by(case((User.email == login, 0), (User.username == login, 1), else_=2))
+        .first()
+    )
+
+def _store_rehash(db: Session, user: User, new_hash: str) -> None:
+    user.hashed_password = new_hash
+    db.commit()
+    db.refresh(user)
+
+async def _authenticate(db: Session, user: Optional[User], password: str) -> bool:
+    """
+    Check the password on the hashing pool; a hash made with outdated
+    parameters is replaced while the plain password is at hand
+    """
+    if user is None:
+        return False
+    verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if verified and new_hash:
+        await run_in_threadpool(_store_rehash, db, user, new_hash)
+    return verified
+
 @router.post("/login", response_model=Token)
-def login_for_access_token(
+async def login_for_access_token(
     db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
-    # First try to find the user by email
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user:
-        # Then try to find by username
-        user = db.query(User).filter(User.username == form_data.username).first()
+    user = await run_in_threadpool(_find_login_user, db, form_data.username)
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not await _authenticate(db, user, form_data.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email/username or password",
@@ -110,11 +177,11 @@ def login_for_access_token(
     return response
 
 @router.post("/json-login", response_model=Token)
-def json_login(login_data: LoginRequest, db: Session = Depends(get_db)) -> Any:
+async def json_login(login_data: LoginRequest, db: Session = Depends(get_db)) -> Any:
     """Alternate login endpoint that accepts JSON instead of form data"""
-    user = db.query(User).filter(User.email == login_data.email).first()
+    user = await run_in_threadpool(_find_login_user, db, login_data.email)
     
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    if not await _authenticate(db, user, login_data.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -127,37 +194,49 @@ def json_login(login_data: LoginRequest, db: Session = Depends(get_db)) -> Any:
     
     return {"access_token": access_token, "token_type": "bearer"}
 
-@router.post("/register", response_model=UserSchema)
-def register(user_in: UserCreate, db: Session = Depends(get_db)) -> Any:
-    """Register a new user"""
-    # Check if user with this email exists
-    user = db.query(User).filter(User.email == user_in.email).first()
-    if user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="A user with this email already exists",
-        )
-    
-    # Check if user with this username exists
-    user = db.query(User).filter(User.username == user_in.username).first()
-    if user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="A user with this username already exists",
-        )
-    
-    # Create new user
+# Unique indexes on users -> message for a registration that collides
+UNIQUE_VIOLATION_MESSAGES = {
+    "ix_users_email": "A user with this email already exists",
+    "ix_users_username": "A user with this username already exists",
+    # Same as an existing one apart from letter case
+    "ux_users_email_lower": "A user with this email already exists",
+    "ux_users_username_lower": "A user with this username already exists",
+}
+
+def raise_unique_violation(error: IntegrityError) -> None:
+    """Turn a duplicate email/username into a 400, re-raise anything else"""
+    diag = getattr(error.orig, "diag", None)
+    constraint = getattr(diag, "constraint_name", None)
+    if constraint not in UNIQUE_VIOLATION_MESSAGES:
+        raise error
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=UNIQUE_VIOLATION_MESSAGES[constraint],
+    )
+
+def _insert_user(db: Session, user_in: UserCreate, hashed_password: str) -> User:
+    """Insert optimistically and let the unique indexes catch duplicates"""
     db_user = User(
         email=user_in.email,
         username=user_in.username,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=hashed_password,
         is_active=True,
     )
     db.add(db_user)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        raise_unique_violation(e)
     db.refresh(db_user)
     return db_user
 
+@router.post("/register", response_model=UserSchema)
+async def register(user_in: UserCreate, db: Session = Depends(get_db)) -> Any:
+    """Register a new user"""
+    hashed_password = await password_hasher.hash(user_in.password)
+    return await run_in_threadpool(_insert_user, db, user_in, hashed_password)
+
 @router.get("/user", response_model=UserSchema)
 def get_current_user_info(current_user: User = Depends(get_current_active_user)) -> Any:
     """Get current user information"""
@@ -171,6 +250,6 @@ def logout():
     return response
 
 @router.get("/verify-token", response_model=UserSchema)
-def verify_token(current_user: User = Depends(get_current_active_user)) -> Any:
+async def verify_token(identity: UserSchema = Depends(get_verified_identity)) -> Any:
     """Verify token and return user if valid"""
-    return current_user
\ No newline at end of file
+    return identity
\ No newline at end of file
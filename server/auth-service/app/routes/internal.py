@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.identity_cache import identity_cache, invalidate_identity
+from app.core.internal import verify_internal_key
+from app.core.password_hasher import password_hasher
+from app.db.session import get_db
+from app.models.user import User
+from app.utils.cache_invalidation import invalidate_user_caches
+
+# Service-to-service routes - not exposed through the Kong gateway
+router = APIRouter(dependencies=[Depends(verify_internal_key)])
+
+# The identity cache is only touched on the event loop, so these routes are async
+@router.post("/users/{user_id}/invalidate", status_code=status.HTTP_204_NO_CONTENT)
+async def invalidate_user(user_id: int):
+    """Drop a cached identity, e.g. after the user was changed directly in the database"""
+    invalidate_identity(user_id)
+
+def _deactivate(db: Session, user_id: int) -> None:
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    user.is_active = False
+    db.commit()
+
+@router.post("/users/{user_id}/deactivate", status_code=status.HTTP_204_NO_CONTENT)
+async def deactivate_user(user_id: int, db: Session = Depends(get_db)):
+    """Deactivate a user; their tokens stop verifying right away on this instance"""
+    await run_in_threadpool(_deactivate, db, user_id)
+    invalidate_identity(user_id)
+    await invalidate_user_caches(user_id)
+
+@router.get("/metrics")
+async def get_metrics():
+    """Identity cache and password hashing statistics for monitoring"""
+    return {
+        "identity_cache": identity_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+    }
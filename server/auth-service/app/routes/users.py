@@ -1,5 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from fastapi.responses import JSONResponse
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import Any, Optional
 import shutil
@@ -9,7 +11,9 @@ from pathlib import Path
 from app.db.session import get_db
 from app.models.user import User
 from app.schemas.user import User as UserSchema, UserUpdate
-from app.routes.auth import get_current_active_user
+from app.routes.auth import get_current_active_user, raise_unique_violation
+from app.utils.cache_invalidation import invalidate_user_caches
+from app.core.identity_cache import invalidate_identity
 
 router = APIRouter()
 
@@ -37,9 +41,12 @@ async def update_user_me(
     """
     Update own user.
     """
-    # Check if username already exists
+    # Check if username already exists - logins are unique regardless of case
     if username and username != current_user.username:
-        user_with_username = db.query(User).filter(User.username == username).first()
+        user_with_username = db.query(User).filter(
+            func.lower(User.username) == username.lower(),
+            User.id != current_user.id
+        ).first()
         if user_with_username:
             raise HTTPException(
                 status_code=400,
@@ -48,7 +55,10 @@ async def update_user_me(
     
     # Check if email already exists
     if email and email != current_user.email:
-        user_with_email = db.query(User).filter(User.email == email).first()
+        user_with_email = db.query(User).filter(
+            func.lower(User.email) == email.lower(),
+            User.id != current_user.id
+        ).first()
         if user_with_email:
             raise HTTPException(
                 status_code=400,
@@ -75,6 +85,7 @@ async def update_user_me(
         current_user.profile_image = str(file_path)
     
     # Update other fields
+    username_changed = bool(username) and username != current_user.username
     if username:
         current_user.username = username
     
@@ -85,8 +96,18 @@ async def update_user_me(
         current_user.bio = bio
     
     db.add(current_user)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError as e:
+        # Lost a race with another account taking the same username or email
+        db.rollback()
+        raise_unique_violation(e)
     db.refresh(current_user)
+    invalidate_identity(current_user.id)
+    
+    # Other services cache usernames - drop the stale entry
+    if username_changed:
+        await invalidate_user_caches(current_user.id)
     
     return current_user
 
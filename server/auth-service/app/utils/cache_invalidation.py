@@ -0,0 +1,22 @@
+import logging
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+async def invalidate_user_caches(user_id: int) -> None:
+    """
+    Tell downstream services that cache user summaries to drop this user.
+    Best effort - their caches also expire on a TTL, so failures are only logged.
+    """
+    try:
+        async with httpx.AsyncClient(timeout=2.0) as client:
+            await client.post(
+                f"{settings.FRIENDSHIP_SERVICE_URL}/internal/users/{user_id}/invalidate",
+                headers={"X-Internal-Key": settings.INTERNAL_API_KEY}
+            )
+    except httpx.RequestError as e:
+        logger.warning(f"Could not invalidate cached user {user_id} in friendship service: {e}")
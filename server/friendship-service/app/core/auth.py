@@ -71,6 +71,8 @@ async def get_current_user(
                 raise credentials_exception
             
             user_data = response.json()
+            # Keep the token so downstream calls to other services can reuse it
+            user_data["access_token"] = token
             return user_data
     except httpx.RequestError:
         raise HTTPException(
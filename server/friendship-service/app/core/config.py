@@ -14,12 +14,59 @@ class Settings(BaseSettings):
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "friendship_db")
     DATABASE_URL: str = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}/{POSTGRES_DB}"
     
+    # Connection pool
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # asyncpg statement caches - per connection, 0 disables
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", "500"))
+    # Transaction-pooling PgBouncer can't keep prepared statements - disables both caches
+    DB_PGBOUNCER_MODE: bool = os.getenv("DB_PGBOUNCER_MODE", "false").lower() == "true"
+    
     # CORS - define a default list of allowed origins
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:5173" , "http://localhost:8080"]
     
     # Microservice URLs
     AUTH_SERVICE_URL: str = os.getenv("AUTH_SERVICE_URL", "http://localhost:8000")
     
+    # Websocket service event ingest (real-time notifications)
+    WEBSOCKET_SERVICE_URL: str = os.getenv("WEBSOCKET_SERVICE_URL", "http://localhost:8003")
+    EVENTS_ENABLED: bool = os.getenv("EVENTS_ENABLED", "true").lower() == "true"
+    
+    # Shared secret for service-to-service calls on /internal routes
+    INTERNAL_API_KEY: str = os.getenv("INTERNAL_API_KEY", "internal-api-key-please-change-in-production")
+    
+    # Friendship listing page sizes (default applies when a client passes no limit)
+    FRIENDSHIP_PAGE_SIZE: int = int(os.getenv("FRIENDSHIP_PAGE_SIZE", "50"))
+    FRIENDSHIP_MAX_PAGE_SIZE: int = int(os.getenv("FRIENDSHIP_MAX_PAGE_SIZE", "200"))
+    
+    # Maximum friendships changed by one bulk request
+    FRIENDSHIP_BULK_MAX_ITEMS: int = int(os.getenv("FRIENDSHIP_BULK_MAX_ITEMS", "200"))
+    
+    # How long notification-badge counts may be served from cache
+    FRIENDSHIP_COUNTS_TTL_SECONDS: int = int(os.getenv("FRIENDSHIP_COUNTS_TTL_SECONDS", "10"))
+    
+    # Overlay changes applied to the in-memory friend graph before it is compacted
+    FRIEND_GRAPH_COMPACT_THRESHOLD: int = int(os.getenv("FRIEND_GRAPH_COMPACT_THRESHOLD", "1024"))
+    # Suggestions run on the event loop, so they sample at most this many of the
+    # user's friends, and this many friend ids from each of those friends
+    FRIEND_GRAPH_SUGGESTION_FANOUT: int = int(os.getenv("FRIEND_GRAPH_SUGGESTION_FANOUT", "100"))
+    FRIEND_GRAPH_SUGGESTION_SCAN: int = int(os.getenv("FRIEND_GRAPH_SUGGESTION_SCAN", "500"))
+    
+    # Batch limit for the mutual-friends endpoint (one search results page)
+    MUTUAL_FRIENDS_MAX_TARGETS: int = int(os.getenv("MUTUAL_FRIENDS_MAX_TARGETS", "100"))
+    
+    # User summary cache (usernames fetched from the auth service)
+    USER_CACHE_MAX_SIZE: int = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", "300"))
+    # Auth-service lookups in flight at once when filling misses
+    USER_CACHE_FETCH_CONCURRENCY: int = int(os.getenv("USER_CACHE_FETCH_CONCURRENCY", "10"))
+    # Optional shared tier - leave empty to keep the cache in-process only
+    USER_CACHE_REDIS_URL: str = os.getenv("USER_CACHE_REDIS_URL", "")
+    
     class Config:
         case_sensitive = True
 
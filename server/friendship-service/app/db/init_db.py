@@ -1,6 +1,7 @@
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
 import logging
 from app.db.session import engine, Base
+from app.db.migrate_canonical_pairs import migrate_canonical_pairs
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -13,8 +14,15 @@ async def init_db():
         async with engine.begin() as conn:
             # Create all tables
             await conn.run_sync(Base.metadata.create_all)
+            # Change-log tables created before created_at switched from now()
+            await conn.execute(text(
+                "ALTER TABLE friendship_changes ALTER COLUMN created_at SET DEFAULT clock_timestamp()"
+            ))
             
         logger.info("Database tables created successfully")
+        
+        # Bring tables created before canonical-pair storage up to date
+        await migrate_canonical_pairs()
     except Exception as e:
         logger.error(f"Error initializing database: {e}")
         raise
\ No newline at end of file
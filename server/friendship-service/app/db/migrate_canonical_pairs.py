@@ -0,0 +1,78 @@
+"""
+Migrate the friendships table to canonical-pair storage.
+
+Adds and backfills user_low/user_high, removes duplicate rows for the same
+pair of users, then creates the unique pair index and the composite listing
+indexes. The unique pair index is created last of the data changes, so once
+it exists the migration is skipped.
+"""
+import asyncio
+import logging
+
+from sqlalchemy import text
+
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_STATEMENTS = [
+    "ALTER TABLE friendships ADD COLUMN IF NOT EXISTS user_low INTEGER",
+    "ALTER TABLE friendships ADD COLUMN IF NOT EXISTS user_high INTEGER",
+    """
+    UPDATE friendships
+    SET user_low = LEAST(requester_id, addressee_id),
+        user_high = GREATEST(requester_id, addressee_id)
+    WHERE user_low IS NULL OR user_high IS NULL
+    """,
+]
+
+# Keep one row per pair: accepted beats pending beats rejected, then the oldest
+DEDUPLICATE_STATEMENT = """
+    DELETE FROM friendships f
+    USING (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY user_low, user_high
+            ORDER BY CASE status::text
+                WHEN 'ACCEPTED' THEN 0
+                WHEN 'PENDING' THEN 1
+                ELSE 2
+            END, id
+        ) AS rn
+        FROM friendships
+    ) ranked
+    WHERE f.id = ranked.id AND ranked.rn > 1
+"""
+
+INDEX_STATEMENTS = [
+    "ALTER TABLE friendships ALTER COLUMN user_low SET NOT NULL",
+    "ALTER TABLE friendships ALTER COLUMN user_high SET NOT NULL",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_friendships_pair ON friendships (user_low, user_high)",
+    "CREATE INDEX IF NOT EXISTS ix_friendships_addressee_status ON friendships (addressee_id, status, id)",
+    "CREATE INDEX IF NOT EXISTS ix_friendships_requester_status ON friendships (requester_id, status, id)",
+    # The composite indexes lead with the same columns, so these are redundant
+    "DROP INDEX IF EXISTS ix_friendships_requester_id",
+    "DROP INDEX IF EXISTS ix_friendships_addressee_id",
+]
+
+PAIR_INDEX_EXISTS = """
+    SELECT 1 FROM pg_indexes
+    WHERE tablename = 'friendships' AND indexname = 'ux_friendships_pair'
+"""
+
+async def migrate_canonical_pairs():
+    """Backfill canonical pairs and create the friendship indexes, once"""
+    async with engine.begin() as conn:
+        if (await conn.execute(text(PAIR_INDEX_EXISTS))).first() is not None:
+            logger.info("Friendship canonical-pair migration already applied")
+            return
+        for statement in BACKFILL_STATEMENTS:
+            await conn.execute(text(statement))
+        deleted = (await conn.execute(text(DEDUPLICATE_STATEMENT))).rowcount
+        logger.info(f"Removed {deleted} duplicate friendship rows")
+        for statement in INDEX_STATEMENTS:
+            await conn.execute(text(statement))
+    logger.info("Friendship canonical-pair migration completed")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate_canonical_pairs())
@@ -1,13 +1,87 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
+import time
+from uuid import uuid4
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base
 
 from app.core.config import settings
 
+class PoolMetrics:
+    """How long requests wait to check a connection out of the pool"""
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, wait_seconds: float):
+        self.checkouts += 1
+        self.total_wait_seconds += wait_seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def stats(self):
+        pool = engine.pool
+        return {
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+        }
+
+pool_metrics = PoolMetrics()
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that times each checkout. Sessions still check a connection
+    out lazily on their first query, so the pool isn't held while a request
+    waits on the auth service.
+    """
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        pool_metrics.record(time.perf_counter() - started)
+        return connection
+
+def _build_engine():
+    url = make_url(settings.DATABASE_URL).set(drivername="postgresql+asyncpg")
+    connect_args = {}
+
+    if settings.DB_PGBOUNCER_MODE:
+        # PgBouncer in transaction mode hands each transaction a different server
+        # connection, so named prepared statements must not be reused or collide
+        url = url.update_query_dict({"prepared_statement_cache_size": "0"})
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+    else:
+        url = url.update_query_dict({
+            "prepared_statement_cache_size": str(settings.DB_PREPARED_STATEMENT_CACHE_SIZE)
+        })
+        connect_args["statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+
+    return create_async_engine(
+        url,
+        poolclass=TimedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
 # Create async database engine
-engine = create_async_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"))
+engine = _build_engine()
 SessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 Base = declarative_base()
@@ -18,4 +92,4 @@ async def get_db():
     try:
         yield db
     finally:
-        await db.close()
\ No newline at end of file
+        await db.close()
@@ -1,9 +1,13 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 
 from app.core.config import settings
 from app.db.init_db import init_db
-from app.routes import friendships
+from app.db.session import SessionLocal
+from app.routes import friendships, internal
+from app.services.friend_graph import load_friend_graph
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -18,15 +22,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Sessions check connections out lazily, so pool exhaustion surfaces from any query
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Database connection pool exhausted"}
+    )
+
 app.include_router(friendships.router, prefix="", tags=["friendships"])
+app.include_router(internal.router, prefix="/internal", tags=["internal"])
 
 @app.on_event("startup")
 async def startup_event():
     # Initialize database tables and initial data
     await init_db()
+    
+    # Build the in-memory friend graph from accepted friendships
+    async with SessionLocal() as db:
+        await load_friend_graph(db)
 
 # Add a root endpoint for debugging
 @app.get("/")
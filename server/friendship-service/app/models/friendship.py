@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Enum
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Enum, Index
 from sqlalchemy.sql import func
 import enum
 from app.db.session import Base
@@ -8,15 +8,46 @@ class FriendshipStatus(str, enum.Enum):
     ACCEPTED = "accepted"
     REJECTED = "rejected"
 
+def canonical_pair(user_a: int, user_b: int) -> tuple:
+    """Order two user ids so a friendship has one key regardless of who asked"""
+    return (user_a, user_b) if user_a < user_b else (user_b, user_a)
+
 class Friendship(Base):
     __tablename__ = "friendships"
+    __table_args__ = (
+        # One row per pair of users, whichever direction the request went
+        Index("ux_friendships_pair", "user_low", "user_high", unique=True),
+        # Listing indexes - id last so keyset pagination stays a range scan
+        Index("ix_friendships_addressee_status", "addressee_id", "status", "id"),
+        Index("ix_friendships_requester_status", "requester_id", "status", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    requester_id = Column(Integer, index=True)
-    addressee_id = Column(Integer, index=True)
+    requester_id = Column(Integer)
+    addressee_id = Column(Integer)
+    user_low = Column(Integer, nullable=False)
+    user_high = Column(Integer, nullable=False)
     status = Column(Enum(FriendshipStatus), default=FriendshipStatus.PENDING)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class FriendshipChangeType(str, enum.Enum):
+    CREATED = "created"
+    STATUS_CHANGED = "status_changed"
+    DELETED = "deleted"
+
+class FriendshipChange(Base):
+    """Append-only log of friendship changes, written in the same transaction as the change"""
+    __tablename__ = "friendship_changes"
+
+    seq = Column(BigInteger, primary_key=True, autoincrement=True)
+    friendship_id = Column(Integer, nullable=False)
+    requester_id = Column(Integer, nullable=False)
+    addressee_id = Column(Integer, nullable=False)
+    change_type = Column(String(32), nullable=False)
+    status = Column(String(16), nullable=True)
+    # Insert time rather than transaction start
+    created_at = Column(DateTime(timezone=True), server_default=func.clock_timestamp())
@@ -1,174 +1,163 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, Header
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import or_, and_, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Any, List, Optional, Dict
-import httpx
+from typing import Any, List, Literal, Optional, Dict
 
 from app.db.session import get_db
 from app.core.auth import get_current_user
 from app.core.config import settings
-from app.models.friendship import Friendship, FriendshipStatus
+from app.core.internal import verify_internal_key
+from app.models.friendship import Friendship, FriendshipStatus, FriendshipChangeType, canonical_pair
+from app.services.change_log import record_change, commit_changes, get_changes_since
+from app.services.event_publisher import publish_events, friendship_event
+from app.services.friend_graph import friend_graph, apply_status_change, intersect_sorted
+from app.services.friendship_counts import get_friendship_counts, invalidate_friendship_counts
+from app.services.user_cache import user_cache
 from app.schemas.friendship import (
     Friendship as FriendshipSchema,
     FriendshipCreate,
     FriendshipStatusUpdate,
-    FriendshipWithUserDetails
+    FriendshipWithUserDetails,
+    FriendshipCounts,
+    FriendSuggestion,
+    MutualFriends,
+    FriendshipChangePage,
+    FriendshipBulkRequest,
+    FriendshipBulkItemResult,
+    FriendshipBulkResponse
 )
 
 router = APIRouter()
 
-# Helper function to get all user friendships (reused in multiple routes)
-async def _get_user_friendships(db: AsyncSession, current_user: Dict[str, Any]):
+# Helper to attach usernames of the other participants, resolved through the user cache
+async def _enrich_friendships(friendships, current_user: Dict[str, Any]) -> List[FriendshipWithUserDetails]:
+    other_ids = set()
+    for friendship in friendships:
+        if friendship.requester_id != current_user["id"]:
+            other_ids.add(friendship.requester_id)
+        if friendship.addressee_id != current_user["id"]:
+            other_ids.add(friendship.addressee_id)
+    
+    usernames = await user_cache.get_usernames(other_ids, current_user.get("access_token", ""))
+    
+    result = []
+    for friendship in friendships:
+        enriched_friendship = FriendshipWithUserDetails.from_orm(friendship)
+        if friendship.requester_id != current_user["id"]:
+            enriched_friendship.requester_username = usernames.get(friendship.requester_id)
+        if friendship.addressee_id != current_user["id"]:
+            enriched_friendship.addressee_username = usernames.get(friendship.addressee_id)
+        result.append(enriched_friendship)
+    
+    return result
+
+class PageParams:
+    """
+    Keyset pagination parameters shared by the listing routes. Every list is
+    bounded: without limit a page of FRIENDSHIP_PAGE_SIZE rows is returned,
+    and clients follow X-Next-Cursor for the rest.
+    """
+    def __init__(
+        self,
+        limit: int = Query(settings.FRIENDSHIP_PAGE_SIZE, ge=1, le=settings.FRIENDSHIP_MAX_PAGE_SIZE),
+        cursor: Optional[int] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+        order: Literal["asc", "desc"] = Query("desc", description="Sort by friendship id (creation order)")
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.order = order
+
+# Apply keyset pagination - fetch one extra row to know whether another page exists
+def _paginate(query, page: PageParams):
+    if page.order == "desc":
+        if page.cursor is not None:
+            query = query.where(Friendship.id < page.cursor)
+        query = query.order_by(Friendship.id.desc())
+    else:
+        if page.cursor is not None:
+            query = query.where(Friendship.id > page.cursor)
+        query = query.order_by(Friendship.id.asc())
+    return query.limit(page.limit + 1)
+
+def _split_page(rows, page: PageParams):
+    rows = list(rows)
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        return rows, rows[-1].id
+    return rows, None
+
+def _set_next_cursor(response: Response, next_cursor: Optional[int]):
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+
+# Helper function to get a page of user friendships (reused in multiple routes)
+async def _get_user_friendships(
+    db: AsyncSession,
+    current_user: Dict[str, Any],
+    page: PageParams,
+    status_filter: Optional[FriendshipStatus] = None
+):
     query = select(Friendship).where(
         or_(
             Friendship.requester_id == current_user["id"],
             Friendship.addressee_id == current_user["id"]
         )
     )
-    result = await db.execute(query)
-    friendships = result.scalars().all()
+    if status_filter is not None:
+        query = query.where(Friendship.status == status_filter)
     
-    # Enrich with user data from auth service
-    result = []
-    async with httpx.AsyncClient() as client:
-        for friendship in friendships:
-            enriched_friendship = FriendshipWithUserDetails.from_orm(friendship)
-            
-            # Get requester details if not current user
-            if friendship.requester_id != current_user["id"]:
-                try:
-                    response = await client.get(
-                        f"{settings.AUTH_SERVICE_URL}/api/users/{friendship.requester_id}",
-                        headers={"Authorization": f"Bearer {current_user['access_token']}"}
-                    )
-                    if response.status_code == 200:
-                        user_data = response.json()
-                        enriched_friendship.requester_username = user_data.get("username")
-                except httpx.RequestError:
-                    # Just continue if the auth service is unavailable
-                    pass
-            
-            # Get addressee details if not current user
-            if friendship.addressee_id != current_user["id"]:
-                try:
-                    response = await client.get(
-                        f"{settings.AUTH_SERVICE_URL}/api/users/{friendship.addressee_id}",
-                        headers={"Authorization": f"Bearer {current_user['access_token']}"}
-                    )
-                    if response.status_code == 200:
-                        user_data = response.json()
-                        enriched_friendship.addressee_username = user_data.get("username")
-                except httpx.RequestError:
-                    # Just continue if the auth service is unavailable
-                    pass
-            
-            result.append(enriched_friendship)
+    result = await db.execute(_paginate(query, page))
+    friendships, next_cursor = _split_page(result.scalars().all(), page)
     
-    return result
+    return await _enrich_friendships(friendships, current_user), next_cursor
 
-# Helper function to get pending requests
-async def _get_pending_requests(db: AsyncSession, current_user: Dict[str, Any]):
+# Helper function to get a page of pending requests
+async def _get_pending_requests(db: AsyncSession, current_user: Dict[str, Any], page: PageParams):
     query = select(Friendship).where(
         and_(
             Friendship.addressee_id == current_user["id"],
             Friendship.status == FriendshipStatus.PENDING
         )
     )
-    result = await db.execute(query)
-    pending_requests = result.scalars().all()
+    result = await db.execute(_paginate(query, page))
+    pending_requests, next_cursor = _split_page(result.scalars().all(), page)
     
-    # Enrich with user data from auth service
-    result = []
-    async with httpx.AsyncClient() as client:
-        for friendship in pending_requests:
-            enriched_friendship = FriendshipWithUserDetails.from_orm(friendship)
-            
-            # Get requester details
-            try:
-                response = await client.get(
-                    f"{settings.AUTH_SERVICE_URL}/api/users/{friendship.requester_id}",
-                    headers={"Authorization": f"Bearer {current_user['access_token']}"}
-                )
-                if response.status_code == 200:
-                    user_data = response.json()
-                    enriched_friendship.requester_username = user_data.get("username")
-            except httpx.RequestError:
-                # Just continue if the auth service is unavailable
-                pass
-            
-            result.append(enriched_friendship)
-    
-    return result
+    return await _enrich_friendships(pending_requests, current_user), next_cursor
 
 # Helper function to get all friend requests
-async def _get_friend_requests(db: AsyncSession, current_user: Dict[str, Any]):
-    # Get sent requests
-    sent_query = select(Friendship).where(
-        and_(
-            Friendship.requester_id == current_user["id"],
-            Friendship.status == FriendshipStatus.PENDING
-        )
-    )
-    sent_result = await db.execute(sent_query)
-    sent_requests = sent_result.scalars().all()
-    
-    # Get received requests
-    received_query = select(Friendship).where(
+async def _get_friend_requests(db: AsyncSession, current_user: Dict[str, Any], page: PageParams):
+    # Sent and received requests in one query, split below
+    query = select(Friendship).where(
         and_(
-            Friendship.addressee_id == current_user["id"],
-            Friendship.status == FriendshipStatus.PENDING
+            Friendship.status == FriendshipStatus.PENDING,
+            or_(
+                Friendship.requester_id == current_user["id"],
+                Friendship.addressee_id == current_user["id"]
+            )
         )
     )
-    received_result = await db.execute(received_query)
-    received_requests = received_result.scalars().all()
+    result = await db.execute(_paginate(query, page))
+    requests, next_cursor = _split_page(result.scalars().all(), page)
     
-    # Enrich with user data from auth service
-    result = []
-    async with httpx.AsyncClient() as client:
-        # Process sent requests
-        for friendship in sent_requests:
-            enriched_friendship = FriendshipWithUserDetails.from_orm(friendship)
-            
-            # Get addressee details
-            try:
-                response = await client.get(
-                    f"{settings.AUTH_SERVICE_URL}/api/users/{friendship.addressee_id}",
-                    headers={"Authorization": f"Bearer {current_user['access_token']}"}
-                )
-                if response.status_code == 200:
-                    user_data = response.json()
-                    enriched_friendship.addressee_username = user_data.get("username")
-            except httpx.RequestError:
-                # Just continue if the auth service is unavailable
-                pass
-            
-            result.append(enriched_friendship)
-            
-        # Process received requests
-        for friendship in received_requests:
-            enriched_friendship = FriendshipWithUserDetails.from_orm(friendship)
-            
-            # Get requester details
-            try:
-                response = await client.get(
-                    f"{settings.AUTH_SERVICE_URL}/api/users/{friendship.requester_id}",
-                    headers={"Authorization": f"Bearer {current_user['access_token']}"}
-                )
-                if response.status_code == 200:
-                    user_data = response.json()
-                    enriched_friendship.requester_username = user_data.get("username")
-            except httpx.RequestError:
-                # Just continue if the auth service is unavailable
-                pass
-            
-            result.append(enriched_friendship)
+    # Enrich with user data from the user cache
+    enriched = await _enrich_friendships(requests, current_user)
     
     # Organize by sent and received
+    sent_requests = []
+    received_requests = []
+    for request in enriched:
+        if request.requester_id == current_user["id"]:
+            sent_requests.append(request)
+        else:
+            received_requests.append(request)
+    
     return {
-        "sentRequests": [r for r in result if r.requester_id == current_user["id"]],
-        "receivedRequests": [r for r in result if r.addressee_id == current_user["id"]]
-    }
+        "sentRequests": sent_requests,
+        "receivedRequests": received_requests
+    }, next_cursor
 
 # Original routes
 @router.post("/", response_model=FriendshipSchema)
@@ -178,12 +167,17 @@ async def create_friend_request(
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Create a new friend request"""
-    # Check if friendship already exists
-    query = select(Friendship).where(
-        or_(
-            and_(Friendship.requester_id == current_user["id"], Friendship.addressee_id == friend_request.addressee_id),
-            and_(Friendship.requester_id == friend_request.addressee_id, Friendship.addressee_id == current_user["id"])
+    if friend_request.addressee_id == current_user["id"]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot send a friend request to yourself"
         )
+    
+    # Check if friendship already exists - one probe of the unique pair index
+    user_low, user_high = canonical_pair(current_user["id"], friend_request.addressee_id)
+    query = select(Friendship.id).where(
+        Friendship.user_low == user_low,
+        Friendship.user_high == user_high
     )
     result = await db.execute(query)
     existing_friendship = result.scalar_one_or_none()
@@ -198,63 +192,221 @@ async def create_friend_request(
     new_friendship = Friendship(
         requester_id=current_user["id"],
         addressee_id=friend_request.addressee_id,
+        user_low=user_low,
+        user_high=user_high,
         status=FriendshipStatus.PENDING
     )
     
     db.add(new_friendship)
-    await db.commit()
+    try:
+        # Flush to get the id for the change log, committed together below
+        await db.flush()
+        record_change(db, new_friendship, FriendshipChangeType.CREATED)
+        await commit_changes(db)
+    except IntegrityError:
+        # Lost a race with a concurrent request for the same pair
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Friendship already exists"
+        )
     await db.refresh(new_friendship)
+    invalidate_friendship_counts(new_friendship.requester_id, new_friendship.addressee_id)
+    publish_events([
+        friendship_event("new_friend_request", new_friendship.requester_id, new_friendship.addressee_id)
+    ])
     
     return new_friendship
 
 @router.get("/", response_model=List[FriendshipWithUserDetails])
 async def get_user_friendships(
+    response: Response,
+    status_filter: Optional[FriendshipStatus] = Query(None, alias="status"),
+    page: PageParams = Depends(),
     db: AsyncSession = Depends(get_db),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
-    """Get all friends and friend requests for the current user"""
-    return await _get_user_friendships(db, current_user)
+    """Get friends and friend requests for the current user, optionally filtered by status"""
+    friendships, next_cursor = await _get_user_friendships(db, current_user, page, status_filter)
+    _set_next_cursor(response, next_cursor)
+    return friendships
 
 @router.get("/pending", response_model=List[FriendshipWithUserDetails])
 async def get_pending_friend_requests(
+    response: Response,
+    page: PageParams = Depends(),
     db: AsyncSession = Depends(get_db),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
-    """Get all pending friend requests received by the current user"""
-    return await _get_pending_requests(db, current_user)
+    """Get pending friend requests received by the current user"""
+    requests, next_cursor = await _get_pending_requests(db, current_user, page)
+    _set_next_cursor(response, next_cursor)
+    return requests
 
 @router.get("/requests", response_model=dict)
 async def get_friend_requests(
+    response: Response,
+    page: PageParams = Depends(),
     db: AsyncSession = Depends(get_db),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
-    """Get all friend requests for the current user (both sent and received)"""
-    return await _get_friend_requests(db, current_user)
+    """Get friend requests for the current user (both sent and received)"""
+    requests, next_cursor = await _get_friend_requests(db, current_user, page)
+    _set_next_cursor(response, next_cursor)
+    return requests
 
 # Add routes with full paths to handle Kong forwarding with original paths
 @router.get("/api/friendships", response_model=List[FriendshipWithUserDetails])
 async def get_user_friendships_full_path(
+    response: Response,
+    status_filter: Optional[FriendshipStatus] = Query(None, alias="status"),
+    page: PageParams = Depends(),
     db: AsyncSession = Depends(get_db),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
-    """Get all friends and friend requests for the current user (full path)"""
-    return await _get_user_friendships(db, current_user)
+    """Get friends and friend requests for the current user (full path)"""
+    return await get_user_friendships(response, status_filter, page, db, current_user)
 
 @router.get("/api/friendships/pending", response_model=List[FriendshipWithUserDetails])
 async def get_pending_friend_requests_full_path(
+    response: Response,
+    page: PageParams = Depends(),
     db: AsyncSession = Depends(get_db),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
-    """Get all pending friend requests received by the current user (full path)"""
-    return await _get_pending_requests(db, current_user)
+    """Get pending friend requests received by the current user (full path)"""
+    return await get_pending_friend_requests(response, page, db, current_user)
 
 @router.get("/api/friendships/requests", response_model=dict)
 async def get_friend_requests_full_path(
+    response: Response,
+    page: PageParams = Depends(),
     db: AsyncSession = Depends(get_db),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
-    """Get all friend requests for the current user (both sent and received) (full path)"""
-    return await _get_friend_requests(db, current_user)
+    """Get friend requests for the current user (both sent and received) (full path)"""
+    return await get_friend_requests(response, page, db, current_user)
+
+@router.get("/counts", response_model=FriendshipCounts)
+@router.get("/api/friendships/counts", response_model=FriendshipCounts)
+async def get_friendship_counts_route(
+    db: AsyncSession = Depends(get_db),
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """Get pending and accepted friendship counts for notification badges"""
+    return await get_friendship_counts(db, current_user["id"])
+
+@router.get("/suggestions", response_model=List[FriendSuggestion])
+@router.get("/api/friendships/suggestions", response_model=List[FriendSuggestion])
+async def get_friend_suggestions(
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """Suggest people the current user may know, ranked by mutual friend count"""
+    if not friend_graph.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Friend graph is still loading"
+        )
+    
+    # Don't suggest people with an open or rejected request either way
+    query = select(Friendship.requester_id, Friendship.addressee_id).where(
+        and_(
+            Friendship.status != FriendshipStatus.ACCEPTED,
+            or_(
+                Friendship.requester_id == current_user["id"],
+                Friendship.addressee_id == current_user["id"]
+            )
+        )
+    )
+    result = await db.execute(query)
+    exclude = {user_id for row in result.all() for user_id in row}
+    
+    ranked = friend_graph.suggestions(current_user["id"], limit, exclude=exclude)
+    usernames = await user_cache.get_usernames(
+        [user_id for user_id, _ in ranked], current_user.get("access_token", "")
+    )
+    
+    return [
+        FriendSuggestion(user_id=user_id, username=usernames.get(user_id), mutual_count=mutual_count)
+        for user_id, mutual_count in ranked
+    ]
+
+@router.get("/mutual", response_model=List[MutualFriends])
+@router.get("/api/friendships/mutual", response_model=List[MutualFriends])
+async def get_mutual_friends(
+    user_ids: List[int] = Query(..., description="Target users, e.g. ?user_ids=1&user_ids=2"),
+    include_ids: int = Query(0, ge=0, le=50, description="Return up to this many mutual friend ids per target"),
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """Get mutual friend counts between the current user and one or many other users"""
+    if len(user_ids) > settings.MUTUAL_FRIENDS_MAX_TARGETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.MUTUAL_FRIENDS_MAX_TARGETS} users per request"
+        )
+    if not friend_graph.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Friend graph is still loading"
+        )
+    
+    my_friends = friend_graph.friends_of(current_user["id"])
+    result = []
+    for user_id in dict.fromkeys(user_ids):
+        mutual = intersect_sorted(my_friends, friend_graph.friends_of(user_id))
+        result.append(MutualFriends(
+            user_id=user_id,
+            mutual_count=len(mutual),
+            mutual_ids=mutual[:include_ids]
+        ))
+    
+    return result
+
+@router.get("/friend-ids/{user_id}", dependencies=[Depends(verify_internal_key)])
+async def get_friend_ids(user_id: int, if_none_match: Optional[str] = Header(None)):
+    """
+    Sorted friend ids of a user for downstream caches (service-to-service only).
+    The ETag changes on any accept or delete, so callers can revalidate with If-None-Match.
+    """
+    if not friend_graph.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Friend graph is still loading"
+        )
+    
+    version = friend_graph.version_of(user_id)
+    etag = f'"{version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return JSONResponse(
+        content={
+            "user_id": user_id,
+            "version": version,
+            "friend_ids": list(friend_graph.friends_of(user_id))
+        },
+        headers=headers
+    )
+
+@router.get("/changes", response_model=FriendshipChangePage, dependencies=[Depends(verify_internal_key)])
+async def get_friendship_changes(
+    since: int = Query(0, ge=0, description="Last seq the consumer has processed"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Friendship change feed for incremental sync (service-to-service only).
+    Seqs follow commit order, so next_since never skips a late commit.
+    """
+    changes = await get_changes_since(db, since, limit)
+    return {
+        "changes": changes,
+        "next_since": changes[-1].seq if changes else since
+    }
 
 @router.post("/api/friendships", response_model=FriendshipSchema)
 async def create_friend_request_full_path(
@@ -293,9 +445,17 @@ async def update_friendship_status(
         )
     
     # Update status
+    old_status = friendship.status
     friendship.status = status_update.status
-    await db.commit()
+    record_change(db, friendship, FriendshipChangeType.STATUS_CHANGED)
+    await commit_changes(db)
     await db.refresh(friendship)
+    invalidate_friendship_counts(friendship.requester_id, friendship.addressee_id)
+    apply_status_change(friendship, old_status)
+    if old_status != FriendshipStatus.ACCEPTED and friendship.status == FriendshipStatus.ACCEPTED:
+        publish_events([
+            friendship_event("friend_request_accepted", friendship.requester_id, friendship.addressee_id)
+        ])
     
     return friendship
 
@@ -323,8 +483,13 @@ async def delete_friendship(
             detail="Not authorized to delete this friendship"
         )
     
+    was_accepted = friendship.status == FriendshipStatus.ACCEPTED
+    record_change(db, friendship, FriendshipChangeType.DELETED)
     await db.delete(friendship)
-    await db.commit()
+    await commit_changes(db)
+    invalidate_friendship_counts(friendship.requester_id, friendship.addressee_id)
+    if was_accepted:
+        friend_graph.remove_edge(friendship.requester_id, friendship.addressee_id)
 
 # Also add full path versions of the update and delete endpoints
 @router.patch("/api/friendships/{friendship_id}", response_model=FriendshipSchema)
@@ -344,4 +509,90 @@ async def delete_friendship_full_path(
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """Delete a friendship (unfriend or cancel request) (full path)"""
-    return await delete_friendship(friendship_id, db, current_user)
\ No newline at end of file
+    return await delete_friendship(friendship_id, db, current_user)
+# Bulk accept/decline/cancel/remove - one auth round trip, one transaction
+@router.post("/bulk", response_model=FriendshipBulkResponse)
+@router.post("/api/friendships/bulk", response_model=FriendshipBulkResponse)
+async def bulk_update_friendships(
+    bulk_request: FriendshipBulkRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """Apply accept/decline/cancel/remove to many friendships at once, with a result per item"""
+    if len(bulk_request.items) > settings.FRIENDSHIP_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.FRIENDSHIP_BULK_MAX_ITEMS} friendships per request"
+        )
+    
+    user_id = current_user["id"]
+    ids = sorted({item.id for item in bulk_request.items})
+    # Lock rows in id order so concurrent bulk requests can't deadlock
+    query = select(Friendship).where(Friendship.id.in_(ids)).order_by(Friendship.id).with_for_update()
+    result = await db.execute(query)
+    friendships = {friendship.id: friendship for friendship in result.scalars().all()}
+    
+    results = []
+    status_changes = []
+    deletions = []
+    seen = set()
+    for item in bulk_request.items:
+        friendship = friendships.get(item.id)
+        error = None
+        if item.id in seen:
+            # Only the first item for a friendship is applied
+            error = "Duplicate id in request"
+        elif friendship is None:
+            error = "Friendship not found"
+        elif item.action in ("accept", "decline"):
+            if friendship.addressee_id != user_id:
+                error = "Not authorized to update this friendship"
+            elif friendship.status != FriendshipStatus.PENDING:
+                error = "Friendship is not pending"
+        elif item.action == "cancel":
+            if friendship.requester_id != user_id:
+                error = "Not authorized to cancel this request"
+            elif friendship.status != FriendshipStatus.PENDING:
+                error = "Friendship is not pending"
+        elif friendship.requester_id != user_id and friendship.addressee_id != user_id:
+            error = "Not authorized to delete this friendship"
+        
+        seen.add(item.id)
+        if error:
+            results.append(FriendshipBulkItemResult(id=item.id, action=item.action, ok=False, error=error))
+            continue
+        
+        if item.action in ("accept", "decline"):
+            old_status = friendship.status
+            friendship.status = FriendshipStatus.ACCEPTED if item.action == "accept" else FriendshipStatus.REJECTED
+            record_change(db, friendship, FriendshipChangeType.STATUS_CHANGED)
+            status_changes.append((friendship, old_status))
+            results.append(FriendshipBulkItemResult(
+                id=item.id, action=item.action, ok=True, status=friendship.status.value
+            ))
+        else:
+            deletions.append((friendship, friendship.status == FriendshipStatus.ACCEPTED))
+            record_change(db, friendship, FriendshipChangeType.DELETED)
+            await db.delete(friendship)
+            results.append(FriendshipBulkItemResult(id=item.id, action=item.action, ok=True))
+    
+    # All changes and their change-log rows land in a single commit
+    await commit_changes(db)
+    
+    events = []
+    for friendship, old_status in status_changes:
+        invalidate_friendship_counts(friendship.requester_id, friendship.addressee_id)
+        apply_status_change(friendship, old_status)
+        if friendship.status == FriendshipStatus.ACCEPTED:
+            events.append(
+                friendship_event("friend_request_accepted", friendship.requester_id, friendship.addressee_id)
+            )
+    for friendship, was_accepted in deletions:
+        invalidate_friendship_counts(friendship.requester_id, friendship.addressee_id)
+        if was_accepted:
+            friend_graph.remove_edge(friendship.requester_id, friendship.addressee_id)
+    
+    # Notifications for the whole batch go out in one request
+    publish_events(events)
+    
+    return FriendshipBulkResponse(results=results)
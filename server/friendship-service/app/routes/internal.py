@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, status
+
+from app.core.internal import verify_internal_key
+from app.db.session import pool_metrics
+from app.services.friend_graph import friend_graph
+from app.services.friendship_counts import counts_cache
+from app.services.user_cache import user_cache
+
+# Service-to-service routes - not exposed through the Kong gateway
+router = APIRouter(dependencies=[Depends(verify_internal_key)])
+
+@router.post("/users/{user_id}/invalidate", status_code=status.HTTP_204_NO_CONTENT)
+async def invalidate_user(user_id: int):
+    """Drop a cached user summary (called by the auth service on profile changes)"""
+    await user_cache.invalidate(user_id)
+
+@router.get("/metrics")
+async def get_metrics():
+    """Cache and connection pool statistics for monitoring"""
+    return {
+        "user_cache": user_cache.stats(),
+        "counts_cache": counts_cache.stats(),
+        "friend_graph": friend_graph.stats(),
+        "db_pool": pool_metrics.stats(),
+    }
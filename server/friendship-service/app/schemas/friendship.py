@@ -1,7 +1,7 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 from enum import Enum
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class FriendshipStatus(str, Enum):
     PENDING = "pending"
@@ -32,4 +32,54 @@ class FriendshipWithUserDetails(Friendship):
     addressee_username: Optional[str] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class FriendshipCounts(BaseModel):
+    pending_received: int
+    pending_sent: int
+    friends: int
+
+class FriendSuggestion(BaseModel):
+    user_id: int
+    username: Optional[str] = None
+    mutual_count: int
+
+class MutualFriends(BaseModel):
+    user_id: int
+    mutual_count: int
+    mutual_ids: List[int] = []
+
+class FriendshipChange(BaseModel):
+    seq: int
+    friendship_id: int
+    requester_id: int
+    addressee_id: int
+    change_type: str
+    status: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class FriendshipChangePage(BaseModel):
+    changes: List[FriendshipChange]
+    next_since: int
+
+class FriendshipBulkItem(BaseModel):
+    id: int
+    # accept/decline: addressee of a pending request, cancel: requester of a
+    # pending request, remove: either participant (unfriend)
+    action: Literal["accept", "decline", "cancel", "remove"]
+
+class FriendshipBulkRequest(BaseModel):
+    items: List[FriendshipBulkItem] = Field(..., min_length=1)
+
+class FriendshipBulkItemResult(BaseModel):
+    id: int
+    action: str
+    ok: bool
+    status: Optional[str] = None
+    error: Optional[str] = None
+
+class FriendshipBulkResponse(BaseModel):
+    results: List[FriendshipBulkItemResult]
\ No newline at end of file
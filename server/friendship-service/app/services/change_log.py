@@ -0,0 +1,53 @@
+from typing import List
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.friendship import Friendship, FriendshipChange, FriendshipChangeType
+
+# Transaction-level advisory lock that serializes change-log commits
+CHANGE_LOG_LOCK_KEY = 0x46524348
+
+def record_change(db: AsyncSession, friendship: Friendship, change_type: FriendshipChangeType) -> FriendshipChange:
+    """
+    Append a change-log row to the current transaction. The friendship must
+    already have an id (flush first when creating), and the caller finishes
+    with commit_changes without flushing in between.
+    """
+    change = FriendshipChange(
+        friendship_id=friendship.id,
+        requester_id=friendship.requester_id,
+        addressee_id=friendship.addressee_id,
+        change_type=change_type.value,
+        status=friendship.status.value if friendship.status is not None else None,
+    )
+    db.add(change)
+    return change
+
+async def commit_changes(db: AsyncSession) -> None:
+    """
+    Commit a transaction that recorded changes, so seqs follow commit order.
+
+    The advisory lock is taken without flushing, then the commit flushes the
+    change rows - assigning their seqs - and commits before the lock is
+    released. No other transaction can take a seq in between, so once a seq
+    is visible every lower one has committed or rolled back.
+    """
+    with db.no_autoflush:
+        await db.execute(select(func.pg_advisory_xact_lock(CHANGE_LOG_LOCK_KEY)))
+    await db.commit()
+
+async def get_changes_since(db: AsyncSession, since: int, limit: int) -> List[FriendshipChange]:
+    """
+    Changes with seq greater than `since`, oldest first. Seqs are assigned
+    in commit order (see commit_changes), so consumers can resume from the
+    last seq they saw without missing a change that committed late.
+    """
+    query = (
+        select(FriendshipChange)
+        .where(FriendshipChange.seq > since)
+        .order_by(FriendshipChange.seq.asc())
+        .limit(limit)
+    )
+    result = await db.execute(query)
+    return list(result.scalars().all())
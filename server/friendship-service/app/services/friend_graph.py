@@ -0,0 +1,245 @@
+import logging
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.friendship import Friendship, FriendshipStatus
+
+logger = logging.getLogger(__name__)
+
+
+def intersect_sorted(left: Sequence[int], right: Sequence[int]) -> List[int]:
+    """
+    Intersect two ascending id sequences. Uses a linear merge for similar sizes
+    and binary-searches the smaller side into the larger when they are lopsided.
+    """
+    if len(left) > len(right):
+        left, right = right, left
+    if not left:
+        return []
+
+    result = []
+    if len(left) * 8 < len(right):
+        low = 0
+        for value in left:
+            low = bisect_left(right, value, low)
+            if low == len(right):
+                break
+            if right[low] == value:
+                result.append(value)
+        return result
+
+    i = j = 0
+    while i < len(left) and j < len(right):
+        a, b = left[i], right[j]
+        if a == b:
+            result.append(a)
+            i += 1
+            j += 1
+        elif a < b:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def spread_sample(values: Sequence[int], size: int) -> Sequence[int]:
+    """At most size values taken at an even stride, so the sample is stable"""
+    if len(values) <= size:
+        return values
+    return values[::-(-len(values) // size)]
+
+
+class FriendGraph:
+    """
+    In-process adjacency index of accepted friendships.
+
+    The bulk of the graph lives in CSR form: a sorted array of user ids, an
+    offsets array and one flat array of neighbour ids, sorted per user. Changes
+    since the last build go into small per-user add/remove overlays, which are
+    folded back into the arrays once they grow past a threshold.
+
+    Each worker process keeps its own copy, built from the database at startup.
+    It is only read and changed on the event loop, so lookups must stay bounded.
+    """
+
+    def __init__(self, compact_threshold: int = 1024, suggestion_fanout: int = 100, suggestion_scan: int = 500):
+        self.compact_threshold = compact_threshold
+        self.suggestion_fanout = suggestion_fanout
+        self.suggestion_scan = suggestion_scan
+        self.ready = False
+        self._users = array("i")
+        self._offsets = array("q", [0])
+        self._neighbors = array("i")
+        self._added: Dict[int, Set[int]] = defaultdict(set)
+        self._removed: Dict[int, Set[int]] = defaultdict(set)
+        self._pending_changes = 0
+        self.built_at = None
+        self.build_seconds = 0.0
+        # Friend-set versions: a clock seeded from wall time so versions keep
+        # increasing across restarts, and the clock value of each user's last change
+        self._clock = time.time_ns() // 1000
+        self._base_version = self._clock
+        self._versions: Dict[int, int] = {}
+
+    def _load(self, adjacency: Dict[int, Iterable[int]]) -> None:
+        users = array("i")
+        offsets = array("q", [0])
+        neighbors = array("i")
+        for user_id in sorted(adjacency):
+            friends = sorted(set(adjacency[user_id]))
+            if not friends:
+                continue
+            users.append(user_id)
+            neighbors.extend(friends)
+            offsets.append(len(neighbors))
+
+        self._users = users
+        self._offsets = offsets
+        self._neighbors = neighbors
+        self._added.clear()
+        self._removed.clear()
+        self._pending_changes = 0
+
+    def build(self, edges: Iterable[Tuple[int, int]]) -> None:
+        """Replace the whole graph with the given undirected edges"""
+        started = time.perf_counter()
+        adjacency: Dict[int, List[int]] = defaultdict(list)
+        for user_a, user_b in edges:
+            adjacency[user_a].append(user_b)
+            adjacency[user_b].append(user_a)
+        self._load(adjacency)
+        self._clock = max(self._clock + 1, time.time_ns() // 1000)
+        self._base_version = self._clock
+        self._versions.clear()
+        self.ready = True
+        self.built_at = time.time()
+        self.build_seconds = time.perf_counter() - started
+
+    def _base_friends(self, user_id: int) -> Sequence[int]:
+        row = bisect_left(self._users, user_id)
+        if row == len(self._users) or self._users[row] != user_id:
+            return ()
+        return self._neighbors[self._offsets[row]:self._offsets[row + 1]]
+
+    def friends_of(self, user_id: int) -> Sequence[int]:
+        """Sorted friend ids of a user"""
+        base = self._base_friends(user_id)
+        added = self._added.get(user_id)
+        removed = self._removed.get(user_id)
+        if not added and not removed:
+            return base
+        return sorted((set(base) - (removed or set())) | (added or set()))
+
+    def _apply(self, user_id: int, friend_id: int, add: bool) -> None:
+        added = self._added[user_id]
+        removed = self._removed[user_id]
+        if add:
+            removed.discard(friend_id)
+            added.add(friend_id)
+        else:
+            added.discard(friend_id)
+            removed.add(friend_id)
+
+    def add_edge(self, user_a: int, user_b: int) -> None:
+        self._apply(user_a, user_b, add=True)
+        self._apply(user_b, user_a, add=True)
+        self._record_change(user_a, user_b)
+
+    def remove_edge(self, user_a: int, user_b: int) -> None:
+        self._apply(user_a, user_b, add=False)
+        self._apply(user_b, user_a, add=False)
+        self._record_change(user_a, user_b)
+
+    def version_of(self, user_id: int) -> int:
+        """Monotonic version of a user's friend set - changes whenever the set does"""
+        return self._versions.get(user_id, self._base_version)
+
+    def _record_change(self, user_a: int, user_b: int) -> None:
+        self._clock += 1
+        self._versions[user_a] = self._clock
+        self._versions[user_b] = self._clock
+        self._pending_changes += 1
+        if self._pending_changes >= self.compact_threshold:
+            self.compact()
+
+    def compact(self) -> None:
+        """Fold the overlays back into the CSR arrays"""
+        user_ids = set(self._users) | set(self._added) | set(self._removed)
+        self._load({user_id: self.friends_of(user_id) for user_id in user_ids})
+
+    def are_friends(self, user_a: int, user_b: int) -> bool:
+        friends = self.friends_of(user_a)
+        position = bisect_left(friends, user_b)
+        return position < len(friends) and friends[position] == user_b
+
+    def mutual_friends(self, user_a: int, user_b: int) -> List[int]:
+        return intersect_sorted(self.friends_of(user_a), self.friends_of(user_b))
+
+    def suggestions(self, user_id: int, limit: int, exclude: Iterable[int] = ()) -> List[Tuple[int, int]]:
+        """
+        Rank second-degree contacts by number of mutual friends.
+        Returns (user_id, mutual_count) pairs, best first.
+
+        The walk visits at most suggestion_fanout * suggestion_scan ids: for
+        well-connected users it samples friends and friends-of-friends evenly,
+        so counts are estimates but the work done on the event loop is bounded.
+        """
+        friends = self.friends_of(user_id)
+        skip = set(friends)
+        skip.add(user_id)
+        skip.update(exclude)
+
+        mutual_counts: Counter = Counter()
+        for friend_id in spread_sample(friends, self.suggestion_fanout):
+            for candidate in spread_sample(self.friends_of(friend_id), self.suggestion_scan):
+                if candidate not in skip:
+                    mutual_counts[candidate] += 1
+
+        ranked = sorted(mutual_counts.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "ready": self.ready,
+            "users": len(self._users),
+            "edges": len(self._neighbors) // 2,
+            "pending_changes": self._pending_changes,
+            "built_at": self.built_at,
+            "build_seconds": round(self.build_seconds, 4),
+            "memory_bytes": (
+                self._users.itemsize * len(self._users)
+                + self._offsets.itemsize * len(self._offsets)
+                + self._neighbors.itemsize * len(self._neighbors)
+            ),
+        }
+
+
+friend_graph = FriendGraph(
+    compact_threshold=settings.FRIEND_GRAPH_COMPACT_THRESHOLD,
+    suggestion_fanout=settings.FRIEND_GRAPH_SUGGESTION_FANOUT,
+    suggestion_scan=settings.FRIEND_GRAPH_SUGGESTION_SCAN,
+)
+
+async def load_friend_graph(db: AsyncSession) -> None:
+    """Build the friend graph from all accepted friendships"""
+    query = select(Friendship.requester_id, Friendship.addressee_id).where(
+        Friendship.status == FriendshipStatus.ACCEPTED
+    )
+    result = await db.stream(query.execution_options(yield_per=10000))
+    edges = [(requester_id, addressee_id) async for requester_id, addressee_id in result]
+    friend_graph.build(edges)
+    logger.info(f"Friend graph built: {friend_graph.stats()}")
+
+def apply_status_change(friendship: Friendship, old_status) -> None:
+    """Keep the friend graph in step with a friendship status transition"""
+    if old_status == FriendshipStatus.ACCEPTED and friendship.status != FriendshipStatus.ACCEPTED:
+        friend_graph.remove_edge(friendship.requester_id, friendship.addressee_id)
+    elif old_status != FriendshipStatus.ACCEPTED and friendship.status == FriendshipStatus.ACCEPTED:
+        friend_graph.add_edge(friendship.requester_id, friendship.addressee_id)
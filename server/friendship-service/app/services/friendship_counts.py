@@ -0,0 +1,47 @@
+from typing import Any, Dict
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import LRUTTLCache
+from app.core.config import settings
+from app.models.friendship import Friendship, FriendshipStatus
+
+# Short-lived per-user counts for notification badges that poll frequently
+counts_cache = LRUTTLCache(
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    ttl_seconds=settings.FRIENDSHIP_COUNTS_TTL_SECONDS,
+)
+
+async def get_friendship_counts(db: AsyncSession, user_id: int) -> Dict[str, Any]:
+    """Pending-received, pending-sent and accepted counts from a single aggregate query"""
+    cached = counts_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    query = select(
+        func.count().filter(
+            and_(Friendship.addressee_id == user_id, Friendship.status == FriendshipStatus.PENDING)
+        ),
+        func.count().filter(
+            and_(Friendship.requester_id == user_id, Friendship.status == FriendshipStatus.PENDING)
+        ),
+        func.count().filter(Friendship.status == FriendshipStatus.ACCEPTED),
+    ).where(
+        or_(Friendship.requester_id == user_id, Friendship.addressee_id == user_id)
+    )
+    result = await db.execute(query)
+    pending_received, pending_sent, friends = result.one()
+
+    counts = {
+        "pending_received": pending_received,
+        "pending_sent": pending_sent,
+        "friends": friends,
+    }
+    counts_cache.set(user_id, counts)
+    return counts
+
+def invalidate_friendship_counts(*user_ids: int) -> None:
+    """Drop cached counts for every participant of a changed friendship"""
+    for user_id in user_ids:
+        counts_cache.delete(user_id)
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import httpx
+
+from app.core.cache import LRUTTLCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "user-summary:"
+
+
+class InMemoryRedis:
+    """
+    Minimal stand-in for the subset of redis.asyncio.Redis used by the shared
+    tier (mget / set with ex / delete), selected with
+    USER_CACHE_REDIS_URL=memory:// for local development.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+
+    def _get(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    async def mget(self, keys: List[str]) -> List[Optional[str]]:
+        return [self._get(key) for key in keys]
+
+    async def set(self, key: str, value: str, ex: Optional[int] = None) -> bool:
+        expires_at = time.monotonic() + ex if ex else None
+        self._data[key] = (value, expires_at)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            if self._data.pop(key, None) is not None:
+                removed += 1
+        return removed
+
+
+def _create_redis_client(url: str):
+    """Create the shared-tier client, or None if Redis is not configured/installed"""
+    if not url:
+        return None
+    if url == "memory://":
+        return InMemoryRedis()
+    try:
+        import redis.asyncio as redis
+    except ImportError:
+        logger.warning("USER_CACHE_REDIS_URL is set but the redis package is not installed")
+        return None
+    return redis.from_url(url, decode_responses=True)
+
+
+class UserSummaryCache:
+    """
+    Two-tier cache of user summaries (id, username) fetched from the auth service.
+
+    Lookups hit the in-process LRU first, then the optional shared Redis tier,
+    and only then the auth service. Misses for a listing are fetched
+    concurrently, but at most fetch_concurrency auth-service calls are in
+    flight per process, so a cold cache can't flood auth-service's threadpool.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: int, fetch_concurrency: int, redis_client=None):
+        self.local = LRUTTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self.redis = redis_client
+        self.ttl_seconds = ttl_seconds
+        self._fetch_slots = asyncio.Semaphore(fetch_concurrency)
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.remote_fetches = 0
+        self.remote_errors = 0
+
+    @staticmethod
+    def _redis_key(user_id: int) -> str:
+        return f"{REDIS_KEY_PREFIX}{user_id}"
+
+    async def _get_shared(self, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        if self.redis is None or not user_ids:
+            return {}
+        try:
+            raw_values = await self.redis.mget([self._redis_key(uid) for uid in user_ids])
+        except Exception as e:
+            logger.warning(f"User cache shared tier unavailable: {e}")
+            return {}
+
+        found = {}
+        for user_id, raw in zip(user_ids, raw_values):
+            if raw is None:
+                self.shared_misses += 1
+                continue
+            self.shared_hits += 1
+            found[user_id] = json.loads(raw)
+        return found
+
+    async def _set_shared(self, summaries: Dict[int, Dict[str, Any]]) -> None:
+        if self.redis is None:
+            return
+        try:
+            for user_id, summary in summaries.items():
+                await self.redis.set(self._redis_key(user_id), json.dumps(summary), ex=self.ttl_seconds)
+        except Exception as e:
+            logger.warning(f"User cache shared tier unavailable: {e}")
+
+    async def _fetch_remote(
+        self, client: httpx.AsyncClient, user_id: int, token: str
+    ) -> Optional[Dict[str, Any]]:
+        async with self._fetch_slots:
+            self.remote_fetches += 1
+            try:
+                response = await client.get(
+                    f"{settings.AUTH_SERVICE_URL}/api/auth/users/{user_id}",
+                    headers={"Authorization": f"Bearer {token}"}
+                )
+            except httpx.RequestError:
+                # Just continue if the auth service is unavailable
+                self.remote_errors += 1
+                return None
+
+        if response.status_code != 200:
+            return None
+        user_data = response.json()
+        return {"id": user_id, "username": user_data.get("username")}
+
+    async def get_many(self, user_ids: Iterable[int], token: str) -> Dict[int, Dict[str, Any]]:
+        """Resolve summaries for the given user ids, skipping users that cannot be found"""
+        result: Dict[int, Dict[str, Any]] = {}
+        missing: List[int] = []
+
+        for user_id in dict.fromkeys(user_ids):
+            summary = self.local.get(user_id)
+            if summary is not None:
+                result[user_id] = summary
+            else:
+                missing.append(user_id)
+
+        if not missing:
+            return result
+
+        shared = await self._get_shared(missing)
+        for user_id, summary in shared.items():
+            self.local.set(user_id, summary)
+            result[user_id] = summary
+        missing = [uid for uid in missing if uid not in shared]
+
+        if not missing:
+            return result
+
+        async with httpx.AsyncClient() as client:
+            fetched = await asyncio.gather(
+                *(self._fetch_remote(client, user_id, token) for user_id in missing)
+            )
+
+        resolved = {}
+        for user_id, summary in zip(missing, fetched):
+            if summary is None:
+                continue
+            self.local.set(user_id, summary)
+            resolved[user_id] = summary
+        await self._set_shared(resolved)
+
+        result.update(resolved)
+        return result
+
+    async def get_usernames(self, user_ids: Iterable[int], token: str) -> Dict[int, Optional[str]]:
+        summaries = await self.get_many(user_ids, token)
+        return {user_id: summary.get("username") for user_id, summary in summaries.items()}
+
+    async def invalidate(self, user_id: int) -> None:
+        """Drop a user from both tiers, e.g. after a username change"""
+        self.local.delete(user_id)
+        if self.redis is not None:
+            try:
+                await self.redis.delete(self._redis_key(user_id))
+            except Exception as e:
+                logger.warning(f"User cache shared tier unavailable: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "local": self.local.stats(),
+            "shared_enabled": self.redis is not None,
+            "shared_hits": self.shared_hits,
+            "shared_misses": self.shared_misses,
+            "remote_fetches": self.remote_fetches,
+            "remote_errors": self.remote_errors,
+        }
+
+
+user_cache = UserSummaryCache(
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+    fetch_concurrency=settings.USER_CACHE_FETCH_CONCURRENCY,
+    redis_client=_create_redis_client(settings.USER_CACHE_REDIS_URL),
+)
@@ -0,0 +1,82 @@
+import time
+
+from app.services.friend_graph import FriendGraph, intersect_sorted, spread_sample
+
+
+def make_graph(edges, **kwargs):
+    graph = FriendGraph(**kwargs)
+    graph.build(edges)
+    return graph
+
+
+def test_intersect_sorted_merge_and_binary_search():
+    assert intersect_sorted([1, 3, 5, 7], [2, 3, 4, 7]) == [3, 7]
+    assert intersect_sorted([5, 90], list(range(100))) == [5, 90]
+    assert intersect_sorted([], [1, 2]) == []
+
+
+def test_spread_sample_is_bounded_and_stable():
+    values = list(range(1000))
+    sample = spread_sample(values, 100)
+    assert len(sample) <= 100
+    assert sample == spread_sample(values, 100)
+    assert spread_sample([1, 2, 3], 100) == [1, 2, 3]
+
+
+def test_friends_and_mutuals_from_built_graph():
+    graph = make_graph([(1, 2), (1, 3), (2, 3), (3, 4)])
+    assert list(graph.friends_of(3)) == [1, 2, 4]
+    assert graph.are_friends(2, 1)
+    assert not graph.are_friends(1, 4)
+    assert graph.mutual_friends(1, 2) == [3]
+
+
+def test_suggestions_rank_by_mutual_count():
+    # 1 knows 2, 3, 4; 5 shares three friends with 1, 6 shares one
+    graph = make_graph([(1, 2), (1, 3), (1, 4), (5, 2), (5, 3), (5, 4), (6, 2)])
+    assert graph.suggestions(1, limit=10) == [(5, 3), (6, 1)]
+    assert graph.suggestions(1, limit=1) == [(5, 3)]
+    assert graph.suggestions(1, limit=10, exclude={5}) == [(6, 1)]
+
+
+def test_overlay_changes_are_visible_before_compaction():
+    graph = make_graph([(1, 2), (2, 3)])
+    version = graph.version_of(1)
+
+    graph.add_edge(1, 3)
+    graph.remove_edge(1, 2)
+
+    assert list(graph.friends_of(1)) == [3]
+    assert list(graph.friends_of(2)) == [3]
+    assert graph.are_friends(3, 1)
+    assert graph.version_of(1) > version
+    assert graph.stats()["pending_changes"] == 2
+
+
+def test_compaction_folds_overlays_into_arrays():
+    graph = make_graph([(1, 2), (2, 3)], compact_threshold=2)
+
+    graph.add_edge(1, 3)
+    graph.remove_edge(1, 2)
+
+    stats = graph.stats()
+    assert stats["pending_changes"] == 0
+    assert stats["edges"] == 2
+    assert not graph._added and not graph._removed
+    assert list(graph.friends_of(1)) == [3]
+    assert list(graph.friends_of(3)) == [1, 2]
+
+
+def test_suggestions_stay_bounded_for_dense_graphs():
+    # 2000 friends with 1000 friends each would be two million visits unsampled
+    edges = [(0, friend) for friend in range(1, 2001)]
+    edges += [(friend, 10000 + other) for friend in range(1, 2001) for other in range(1000)]
+    graph = make_graph(edges, suggestion_fanout=100, suggestion_scan=500)
+
+    started = time.perf_counter()
+    ranked = graph.suggestions(0, limit=20)
+    elapsed = time.perf_counter() - started
+
+    assert len(ranked) == 20
+    assert all(count <= 100 for _, count in ranked)
+    assert elapsed < 0.5
@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.user_cache import InMemoryRedis, UserSummaryCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(time, "monotonic", fake)
+    return fake
+
+
+def make_cache(redis_client=None, ttl_seconds=60):
+    cache = UserSummaryCache(max_size=100, ttl_seconds=ttl_seconds, fetch_concurrency=4, redis_client=redis_client)
+    cache.fetched = []
+
+    async def fetch_remote(client, user_id, token):
+        cache.fetched.append(user_id)
+        return {"id": user_id, "username": f"user{user_id}"}
+
+    cache._fetch_remote = fetch_remote
+    return cache
+
+
+def test_second_lookup_is_a_local_hit(clock):
+    cache = make_cache()
+    asyncio.run(cache.get_many([1, 2], token=""))
+    result = asyncio.run(cache.get_usernames([1, 2], token=""))
+
+    assert result == {1: "user1", 2: "user2"}
+    assert cache.fetched == [1, 2]
+    assert cache.local.hits == 2
+
+
+def test_shared_tier_fills_a_cold_process(clock):
+    redis_client = InMemoryRedis()
+    asyncio.run(make_cache(redis_client).get_many([1], token=""))
+
+    cold = make_cache(redis_client)
+    result = asyncio.run(cold.get_many([1], token=""))
+
+    assert result == {1: {"id": 1, "username": "user1"}}
+    assert cold.fetched == []
+    assert cold.shared_hits == 1
+
+
+def test_entries_expire_in_both_tiers(clock):
+    redis_client = InMemoryRedis()
+    cache = make_cache(redis_client, ttl_seconds=60)
+    asyncio.run(cache.get_many([1], token=""))
+
+    clock.now += 61
+    asyncio.run(cache.get_many([1], token=""))
+
+    # Missed the shared tier when cold and again after expiry
+    assert cache.fetched == [1, 1]
+    assert cache.shared_misses == 2
+
+
+def test_invalidate_drops_both_tiers(clock):
+    redis_client = InMemoryRedis()
+    cache = make_cache(redis_client)
+    asyncio.run(cache.get_many([1], token=""))
+
+    asyncio.run(cache.invalidate(1))
+    assert asyncio.run(redis_client.mget(["user-summary:1"])) == [None]
+
+    asyncio.run(cache.get_many([1], token=""))
+    assert cache.fetched == [1, 1]
+
+
+def test_unresolvable_users_are_skipped(clock):
+    cache = make_cache()
+
+    async def fetch_remote(client, user_id, token):
+        return None
+
+    cache._fetch_remote = fetch_remote
+    assert asyncio.run(cache.get_many([1], token="")) == {}
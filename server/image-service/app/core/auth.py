@@ -3,6 +3,7 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 import httpx
 from app.core.config import settings
+from app.core.friends import friend_cache
 from typing import Dict, Any, Optional
 
 # Bearer token security with auto_error=False to avoid immediate errors
@@ -81,26 +82,7 @@ async def get_current_user(
 
 async def check_friendship(user_id: int, friend_id: int, token: str) -> bool:
     """
-    Check if two users are friends by calling the friendship service
+    Check if two users are friends using the cached friend set from the friendship service
     """
-    async with httpx.AsyncClient() as client:
-        try:
-            # Send token both in headers and cookies
-            cookies = {"access_token": token}
-            headers = {"Authorization": f"Bearer {token}"}
-            
-            response = await client.get(
-                f"{settings.FRIENDSHIP_SERVICE_URL}/api/friendships/check",
-                params={"user_id": user_id, "friend_id": friend_id},
-                headers=headers,
-                cookies=cookies
-            )
-            
-            if response.status_code == 200:
-                return response.json().get("are_friends", False)
-            else:
-                # Default to not friends if service fails
-                return False
-        except httpx.RequestError:
-            # Default to not friends if service unavailable
-            return False
\ No newline at end of file
+    friend_ids = await friend_cache.get_friend_ids(user_id)
+    return friend_id in friend_ids
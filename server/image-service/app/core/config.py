@@ -29,6 +29,17 @@ class Settings(BaseSettings):
     # Friendship Service
     FRIENDSHIP_SERVICE_URL: str = os.getenv("FRIENDSHIP_SERVICE_URL", "http://localhost:8000")
     
+    # Websocket service event ingest (real-time notifications)
+    WEBSOCKET_SERVICE_URL: str = os.getenv("WEBSOCKET_SERVICE_URL", "http://localhost:8003")
+    EVENTS_ENABLED: bool = os.getenv("EVENTS_ENABLED", "true").lower() == "true"
+    
+    # Shared secret for service-to-service calls on internal routes
+    INTERNAL_API_KEY: str = os.getenv("INTERNAL_API_KEY", "internal-api-key-please-change-in-production")
+    
+    # Friend-id sets cached from the friendship service for private-post visibility
+    FRIEND_IDS_CACHE_MAX_SIZE: int = int(os.getenv("FRIEND_IDS_CACHE_MAX_SIZE", "10000"))
+    FRIEND_IDS_FRESH_SECONDS: int = int(os.getenv("FRIEND_IDS_FRESH_SECONDS", "15"))
+    
     # Image Upload Config
     UPLOAD_DIR: str = "uploads/images"
     MAX_IMAGE_SIZE: int = 5 * 1024 * 1024  # 5MB
@@ -0,0 +1,90 @@
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+
+
+class FriendSetCache:
+    """
+    Per-process cache of friend-id sets from the friendship service, used to
+    decide which private posts a viewer may see in the feed. The websocket
+    service has its own cache of the same /friend-ids endpoint.
+
+    Entries are trusted for FRIEND_IDS_FRESH_SECONDS, after which they are
+    revalidated with If-None-Match; an unchanged set costs a 304 and no body.
+    If the friendship service is unreachable the last known set is served,
+    and users never seen before are treated as having no friends.
+    """
+
+    def __init__(self, max_size: int, fresh_seconds: float):
+        self.max_size = max_size
+        self.fresh_seconds = fresh_seconds
+        # user_id -> (friend ids, etag, fetched_at)
+        self._entries: "OrderedDict[int, Tuple[FrozenSet[int], Optional[str], float]]" = OrderedDict()
+        self.hits = 0
+        self.revalidations = 0
+        self.not_modified = 0
+        self.fetches = 0
+        self.errors = 0
+
+    def _store(self, user_id: int, friend_ids: FrozenSet[int], etag: Optional[str]) -> None:
+        self._entries[user_id] = (friend_ids, etag, time.monotonic())
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get_friend_ids(self, user_id: int) -> FrozenSet[int]:
+        entry = self._entries.get(user_id)
+        if entry is not None and time.monotonic() - entry[2] < self.fresh_seconds:
+            self.hits += 1
+            self._entries.move_to_end(user_id)
+            return entry[0]
+
+        headers = {"X-Internal-Key": settings.INTERNAL_API_KEY}
+        if entry is not None and entry[1]:
+            headers["If-None-Match"] = entry[1]
+            self.revalidations += 1
+        else:
+            self.fetches += 1
+
+        try:
+            async with httpx.AsyncClient(timeout=2.0) as client:
+                response = await client.get(
+                    f"{settings.FRIENDSHIP_SERVICE_URL}/friend-ids/{user_id}",
+                    headers=headers
+                )
+        except httpx.RequestError:
+            self.errors += 1
+            return entry[0] if entry is not None else frozenset()
+
+        if response.status_code == 304 and entry is not None:
+            self.not_modified += 1
+            self._store(user_id, entry[0], entry[1])
+            return entry[0]
+
+        if response.status_code != 200:
+            self.errors += 1
+            return entry[0] if entry is not None else frozenset()
+
+        friend_ids = frozenset(response.json().get("friend_ids", []))
+        self._store(user_id, friend_ids, response.headers.get("ETag"))
+        return friend_ids
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "not_modified": self.not_modified,
+            "fetches": self.fetches,
+            "errors": self.errors,
+        }
+
+
+friend_cache = FriendSetCache(
+    max_size=settings.FRIEND_IDS_CACHE_MAX_SIZE,
+    fresh_seconds=settings.FRIEND_IDS_FRESH_SECONDS,
+)
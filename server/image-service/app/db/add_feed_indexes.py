@@ -0,0 +1,29 @@
+"""
+Script to add the indexes used by the friend-aware feed queries.
+Run this script once to update the database schema (also run on startup).
+"""
+from sqlalchemy import text
+from app.db.session import engine
+
+FEED_INDEXES = [
+    # Newest-first scan of public posts
+    "CREATE INDEX IF NOT EXISTS ix_posts_created_at ON posts (created_at DESC)",
+    # Private posts from the viewer and their friends (user_id = ANY(...))
+    "CREATE INDEX IF NOT EXISTS ix_posts_user_id_created_at ON posts (user_id, created_at DESC)",
+    # Batched user_has_liked lookup for a page of posts
+    "CREATE INDEX IF NOT EXISTS ix_likes_user_id_post_id ON likes (user_id, post_id)",
+]
+
+def add_feed_indexes():
+    """Create the feed indexes if they don't exist"""
+    with engine.begin() as connection:
+        try:
+            for statement in FEED_INDEXES:
+                connection.execute(text(statement))
+            print("Feed indexes checked/added successfully!")
+        except Exception as e:
+            print(f"Error during migration: {e}")
+
+
+if __name__ == "__main__":
+    add_feed_indexes()
@@ -52,6 +52,10 @@ async def startup_event():
         # Then run the migration to add cloudinary_public_id column
         from app.db.add_cloudinary_column import add_cloudinary_column
         add_cloudinary_column()
+        
+        # And the indexes behind the friend-aware feed query
+        from app.db.add_feed_indexes import add_feed_indexes
+        add_feed_indexes()
         print("Database initialization and migration completed successfully")
     except Exception as e:
         print(f"Error during startup: {e}")
@@ -7,6 +7,7 @@ from app.db.session import get_db
 from app.core.auth import get_current_user, check_friendship
 from app.models.post import Post, Comment
 from app.schemas.post import Comment as CommentSchema, CommentCreate
+from app.utils.event_publisher import publish_events
 
 router = APIRouter()
 
@@ -48,6 +49,16 @@ async def create_comment(
     db.commit()
     db.refresh(db_comment)
     
+    publish_events([{
+        "type": "new_comment",
+        "data": {
+            "post_id": post_id,
+            "author_id": post.user_id,
+            "is_private": post.is_private,
+            "comment": CommentSchema.model_validate(db_comment).model_dump(mode="json")
+        }
+    }])
+    
     return db_comment
 
 @router.get("/{post_id}/comments", response_model=List[CommentSchema])
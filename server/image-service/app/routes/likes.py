@@ -6,6 +6,7 @@ from app.db.session import get_db
 from app.core.auth import get_current_user, check_friendship
 from app.models.post import Post, Like
 from app.schemas.post import Post as PostSchema
+from app.utils.event_publisher import publish_events
 
 router = APIRouter()
 
@@ -43,12 +44,23 @@ async def toggle_like(
         # Unlike the post
         db.delete(like)
         post.likes_count = max(0, post.likes_count - 1)  # Ensure it doesn't go below 0
-        db.commit()
-        return {"liked": False, "likes_count": post.likes_count}
+        liked = False
     else:
         # Like the post
         db_like = Like(post_id=post_id, user_id=user_id)
         db.add(db_like)
         post.likes_count += 1
-        db.commit()
-        return {"liked": True, "likes_count": post.likes_count}
\ No newline at end of file
+        liked = True
+    db.commit()
+    
+    # Subscribers get the new count either way - latest count wins downstream
+    publish_events([{
+        "type": "post_liked",
+        "data": {
+            "post_id": post.id,
+            "likes_count": post.likes_count,
+            "author_id": post.user_id,
+            "is_private": post.is_private
+        }
+    }])
+    return {"liked": liked, "likes_count": post.likes_count}
\ No newline at end of file
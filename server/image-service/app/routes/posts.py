@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, status
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, desc
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import or_, and_, desc, any_, bindparam, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
 from typing import Any, List, Optional
 import shutil
 import os
@@ -13,12 +14,38 @@ import io
 from app.db.session import get_db
 from app.core.config import settings
 from app.core.auth import get_current_user, check_friendship
+from app.core.friends import friend_cache
 from app.models.post import Post, Like, Comment
 from app.schemas.post import Post as PostSchema, PostWithDetails, PostCreate, PostUpdate, PostSearchParams
 from app.utils.cloudinary_utils import upload_image_to_cloudinary, delete_image_from_cloudinary
+from app.utils.event_publisher import publish_events
 
 router = APIRouter()
 
+async def _visible_posts_query(db: Session, user_id: int):
+    """
+    Posts the user may see: public posts, plus private posts from the user and
+    their friends. The friend set is resolved once per request from the cache,
+    so visibility is decided entirely in SQL.
+    """
+    visible_authors = [user_id, *await friend_cache.get_friend_ids(user_id)]
+    return db.query(Post).filter(
+        or_(
+            Post.is_private == False,  # Public posts
+            Post.user_id == any_(bindparam("visible_authors", visible_authors, type_=ARRAY(Integer)))
+        )
+    )
+
+def _liked_post_ids(db: Session, user_id: int, post_ids: List[int]) -> set:
+    """Ids of the given posts the user has liked, in one query"""
+    if not post_ids:
+        return set()
+    rows = db.query(Like.post_id).filter(
+        Like.user_id == user_id,
+        Like.post_id.in_(post_ids)
+    ).all()
+    return {row.post_id for row in rows}
+
 # Create uploads directory if it doesn't exist
 UPLOAD_DIR = Path(settings.UPLOAD_DIR)
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
@@ -113,6 +140,10 @@ async def create_post(
         db.add(db_post)
         db.commit()
         db.refresh(db_post)
+        publish_events([{
+            "type": "new_post",
+            "data": PostSchema.model_validate(db_post).model_dump(mode="json")
+        }])
         return db_post
     
     except Exception as e:
@@ -279,15 +310,8 @@ async def get_posts(
     skip = (page - 1) * size
     
     try:
-        # Base query - get posts that are either:
-        # 1. Public posts from anyone OR
-        # 2. Private posts from the current user
-        query = db.query(Post).filter(
-            or_(
-                Post.is_private == False,  # Public posts
-                and_(Post.is_private == True, Post.user_id == user_id)  # User's own private posts
-            )
-        )
+        # Base query - public posts plus private posts from the user and their friends
+        query = await _visible_posts_query(db, user_id)
         
         # Apply search filter if provided
         if search:
@@ -299,30 +323,13 @@ async def get_posts(
                 )
             )
         
-        # Order by most recent
-        query = query.order_by(desc(Post.created_at))
-        
         # Get the count and posts safely
-        total_count = db.query(Post).count()
-        posts = query.offset(skip).limit(size).all()
+        total_count = query.count()
+        posts = query.order_by(desc(Post.created_at)).offset(skip).limit(size).all()
+        liked_ids = _liked_post_ids(db, user_id, [post.id for post in posts])
         
-        # For each post, check if private posts are from friends and add user_has_liked
         result_posts = []
         for post in posts:
-            # Skip private posts that aren't from the user or their friends
-            if post.is_private and post.user_id != user_id:
-                # Check if the users are friends
-                token = current_user.get("access_token", "")
-                are_friends = await check_friendship(user_id, post.user_id, token)
-                if not are_friends:
-                    continue
-            
-            # Check if the current user has liked the post
-            like = db.query(Like).filter(
-                Like.post_id == post.id,
-                Like.user_id == user_id
-            ).first()
-            
             # Convert to dict to avoid model attribute errors if schema changed
             post_dict = {
                 "id": post.id,
@@ -334,7 +341,7 @@ async def get_posts(
                 "is_private": post.is_private,
                 "created_at": post.created_at,
                 "updated_at": post.updated_at,
-                "user_has_liked": like is not None
+                "user_has_liked": post.id in liked_ids
             }
             
             # Add cloudinary_public_id if it exists in the post object
@@ -380,15 +387,8 @@ async def get_posts_feed(
     """
     user_id = current_user["id"]
     
-    # Base query - get posts that are either:
-    # 1. Public posts from anyone OR
-    # 2. Private posts from the current user
-    query = db.query(Post).filter(
-        or_(
-            Post.is_private == False,  # Public posts
-            and_(Post.is_private == True, Post.user_id == user_id)  # User's own private posts
-        )
-    )
+    # Base query - public posts plus private posts from the user and their friends
+    query = (await _visible_posts_query(db, user_id)).options(selectinload(Post.comments))
     
     # Apply search filter if provided
     if search:
@@ -405,27 +405,12 @@ async def get_posts_feed(
     
     # Apply pagination
     posts = query.offset(skip).limit(limit).all()
+    liked_ids = _liked_post_ids(db, user_id, [post.id for post in posts])
     
-    # For each post, check if private posts are from friends
     result_posts = []
     for post in posts:
-        # Skip private posts that aren't from the user or their friends
-        if post.is_private and post.user_id != user_id:
-            # Check if the users are friends
-            token = current_user.get("access_token", "")
-            are_friends = await check_friendship(user_id, post.user_id, token)
-            if not are_friends:
-                continue
-        
-        # Check if the current user has liked the post
-        like = db.query(Like).filter(
-            Like.post_id == post.id,
-            Like.user_id == user_id
-        ).first()
-        
         post_dict = PostWithDetails.model_validate(post)
-        post_dict.user_has_liked = like is not None
-        
+        post_dict.user_has_liked = post.id in liked_ids
         result_posts.append(post_dict)
     
     return result_posts
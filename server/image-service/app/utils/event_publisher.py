@@ -0,0 +1,33 @@
+import asyncio
+import logging
+from typing import Any, Dict, List
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Keep references so fire-and-forget tasks aren't garbage collected mid-flight
+_pending_tasks = set()
+
+async def _send_events(events: List[Dict[str, Any]]) -> None:
+    try:
+        async with httpx.AsyncClient(timeout=2.0) as client:
+            response = await client.post(
+                f"{settings.WEBSOCKET_SERVICE_URL}/internal/events",
+                json=events,
+                headers={"X-Internal-Key": settings.INTERNAL_API_KEY}
+            )
+            if response.status_code != 202:
+                logger.warning(f"Websocket service rejected events: {response.status_code}")
+    except httpx.RequestError as e:
+        logger.warning(f"Could not publish {len(events)} events: {e}")
+
+def publish_events(events: List[Dict[str, Any]]) -> None:
+    """Send a batch of {"type", "data"} events to the websocket service without waiting"""
+    if not settings.EVENTS_ENABLED or not events:
+        return
+    task = asyncio.create_task(_send_events(events))
+    _pending_tasks.add(task)
+    task.add_done_callback(_pending_tasks.discard)
@@ -139,7 +139,7 @@ curl -i -X POST http://kong-gateway:8101/plugins \
   --data "config.methods[]=OPTIONS" \
   --data "config.methods[]=PATCH" \
   --data "config.headers=Content-Type,Authorization,X-Requested-With,Accept,Origin,Access-Control-Request-Method,Access-Control-Request-Headers" \
-  --data "config.exposed_headers=Authorization" \
+  --data "config.exposed_headers=Authorization,X-Next-Cursor" \
   --data "config.credentials=true" \
   --data "config.max_age=3600"
 
@@ -17,9 +17,77 @@ class Settings(BaseSettings):
     IMAGE_SERVICE_URL: str = os.getenv("IMAGE_SERVICE_URL", "http://localhost:8000")
     FRIENDSHIP_SERVICE_URL: str = os.getenv("FRIENDSHIP_SERVICE_URL", "http://localhost:8000")
     
+    # Shared secret for service-to-service calls on internal routes
+    INTERNAL_API_KEY: str = os.getenv("INTERNAL_API_KEY", "internal-api-key-please-change-in-production")
+    
+    # Friend lists cached from the friendship service for targeted delivery
+    FRIEND_IDS_CACHE_MAX_SIZE: int = int(os.getenv("FRIEND_IDS_CACHE_MAX_SIZE", "50000"))
+    FRIEND_IDS_FRESH_SECONDS: int = int(os.getenv("FRIEND_IDS_FRESH_SECONDS", "30"))
+    # Longest a set the friendship service couldn't confirm still authorizes anything
+    FRIEND_IDS_MAX_STALE_SECONDS: int = int(os.getenv("FRIEND_IDS_MAX_STALE_SECONDS", "300"))
+    
+    # Internal event ingest - queued events beyond this are rejected with 503
+    EVENT_QUEUE_MAX_SIZE: int = int(os.getenv("EVENT_QUEUE_MAX_SIZE", "10000"))
+    EVENT_DISPATCH_WORKERS: int = int(os.getenv("EVENT_DISPATCH_WORKERS", "4"))
+    EVENT_BATCH_MAX_SIZE: int = int(os.getenv("EVENT_BATCH_MAX_SIZE", "1000"))
+    # Optionally also consume events from a Redis Stream (requires USE_REDIS)
+    EVENT_STREAM_ENABLED: bool = os.getenv("EVENT_STREAM_ENABLED", "false").lower() == "true"
+    EVENT_STREAM_KEY: str = os.getenv("EVENT_STREAM_KEY", "everstory:socket-events")
+    EVENT_STREAM_GROUP: str = os.getenv("EVENT_STREAM_GROUP", "websocket-service")
+    
+    # Flush interval for coalesced post_liked / new_comment events, 0 sends each immediately
+    EVENT_COALESCE_INTERVAL_MS: int = int(os.getenv("EVENT_COALESCE_INTERVAL_MS", "250"))
+    
+    # Per-connection outbound queues - stalled clients are dropped after staying
+    # above the high-water mark for SOCKET_SLOW_CONSUMER_SECONDS
+    SOCKET_QUEUE_MAX_SIZE: int = int(os.getenv("SOCKET_QUEUE_MAX_SIZE", "256"))
+    SOCKET_QUEUE_HIGH_WATER: int = int(os.getenv("SOCKET_QUEUE_HIGH_WATER", "192"))
+    SOCKET_SLOW_CONSUMER_SECONDS: float = float(os.getenv("SOCKET_SLOW_CONSUMER_SECONDS", "10"))
+    # Packets handed to engine.io per socket before the outbox holds back
+    SOCKET_TRANSPORT_QUEUE_LIMIT: int = int(os.getenv("SOCKET_TRANSPORT_QUEUE_LIMIT", "32"))
+    
+    # Most post rooms a single connection may be subscribed to at once
+    POST_SUBSCRIPTIONS_MAX: int = int(os.getenv("POST_SUBSCRIPTIONS_MAX", "100"))
+    
+    # Recent targeted events kept per user for replay on reconnect
+    REPLAY_BUFFER_SIZE: int = int(os.getenv("REPLAY_BUFFER_SIZE", "100"))
+    REPLAY_MAX_USERS: int = int(os.getenv("REPLAY_MAX_USERS", "100000"))
+    # Share the buffer between nodes through Redis instead of process memory
+    REPLAY_REDIS_ENABLED: bool = os.getenv("REPLAY_REDIS_ENABLED", "false").lower() == "true"
+    REPLAY_TTL_SECONDS: int = int(os.getenv("REPLAY_TTL_SECONDS", "3600"))
+    REPLAY_META_TTL_SECONDS: int = int(os.getenv("REPLAY_META_TTL_SECONDS", "604800"))
+    
+    # Presence - users count as online until PRESENCE_TTL_SECONDS after they were
+    # last seen; with USE_REDIS last-seen times are shared between nodes
+    PRESENCE_TTL_SECONDS: int = int(os.getenv("PRESENCE_TTL_SECONDS", "60"))
+    PRESENCE_HEARTBEAT_SECONDS: int = int(os.getenv("PRESENCE_HEARTBEAT_SECONDS", "20"))
+    PRESENCE_RETENTION_SECONDS: int = int(os.getenv("PRESENCE_RETENTION_SECONDS", "604800"))
+    PRESENCE_QUERY_MAX: int = int(os.getenv("PRESENCE_QUERY_MAX", "500"))
+    
+    # Connection admission - open sockets per node, new connections per second
+    # (token buckets) per client IP and per user, and open sockets per user
+    ADMISSION_MAX_CONNECTIONS: int = int(os.getenv("ADMISSION_MAX_CONNECTIONS", "10000"))
+    ADMISSION_IP_RATE: float = float(os.getenv("ADMISSION_IP_RATE", "5"))
+    ADMISSION_IP_BURST: int = int(os.getenv("ADMISSION_IP_BURST", "20"))
+    ADMISSION_USER_RATE: float = float(os.getenv("ADMISSION_USER_RATE", "1"))
+    ADMISSION_USER_BURST: int = int(os.getenv("ADMISSION_USER_BURST", "5"))
+    ADMISSION_MAX_SOCKETS_PER_USER: int = int(os.getenv("ADMISSION_MAX_SOCKETS_PER_USER", "5"))
+    ADMISSION_MAX_TRACKED_KEYS: int = int(os.getenv("ADMISSION_MAX_TRACKED_KEYS", "100000"))
+    # Upper bound of the jittered retry hint sent when the node is full
+    ADMISSION_RETRY_AFTER_MAX: float = float(os.getenv("ADMISSION_RETRY_AFTER_MAX", "10"))
+    # Take the client address from X-Forwarded-For (set by the gateway)
+    ADMISSION_TRUST_FORWARDED: bool = os.getenv("ADMISSION_TRUST_FORWARDED", "true").lower() == "true"
+    
+    # Let clients opt into msgpack payloads (auth.encoding = "msgpack")
+    SOCKET_BINARY_ENABLED: bool = os.getenv("SOCKET_BINARY_ENABLED", "true").lower() == "true"
+    
     # Redis configuration for Socket.IO
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     USE_REDIS: bool = os.getenv("USE_REDIS", "false").lower() == "true"
+    # With USE_REDIS and REPLAY_REDIS_ENABLED, send emits for user rooms only to
+    # the nodes hosting those users; routes are refreshed every NODE_ROUTE_TTL_SECONDS / 3
+    NODE_ROUTING_ENABLED: bool = os.getenv("NODE_ROUTING_ENABLED", "false").lower() == "true"
+    NODE_ROUTE_TTL_SECONDS: int = int(os.getenv("NODE_ROUTE_TTL_SECONDS", "30"))
     
     class Config:
         case_sensitive = True
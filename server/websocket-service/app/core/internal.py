@@ -0,0 +1,18 @@
+import secrets
+from typing import Optional
+
+from fastapi import Header, HTTPException, status
+
+from .config import settings
+
+
+async def verify_internal_key(x_internal_key: Optional[str] = Header(None)) -> None:
+    """
+    Guard for service-to-service routes. Callers must send the shared
+    INTERNAL_API_KEY in the X-Internal-Key header.
+    """
+    if not x_internal_key or not secrets.compare_digest(x_internal_key, settings.INTERNAL_API_KEY):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid internal API key"
+        )
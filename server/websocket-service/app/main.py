@@ -1,12 +1,25 @@
+import asyncio
 import socketio
-from fastapi import FastAPI, Depends, HTTPException
+from typing import List
+from fastapi import FastAPI, Body, Depends, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from .core.config import settings
 from .core.auth import validate_token
-from .services.socket_manager import sio, socket_app
+from .core.internal import verify_internal_key
+from .services.event_ingest import dispatcher, parse_events, validate_event, consume_event_stream
+from .services.socket_manager import (
+    sio, socket_app, coalescer, replay_missed_events, register_connection, unregister_connection
+)
+from .services.replay import replay_buffer
+from .services.presence import presence
+from .services.admission import AdmissionRejected, admission, client_ip
+from .services.codec import negotiate
 
 app = FastAPI(title=settings.PROJECT_NAME)
 
+# Replays started from connect, referenced until done so they aren't garbage collected
+_replay_tasks = set()
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -24,10 +37,96 @@ async def root():
     """Health check endpoint"""
     return {"status": "WebSocket service is running"}
 
+@app.post("/internal/events", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(verify_internal_key)])
+async def ingest_events(request: Request):
+    """
+    Accept a batch of events from other services (JSON array or NDJSON) and
+    dispatch them asynchronously - publishers never wait for socket delivery.
+    """
+    try:
+        raw_events = parse_events(await request.body(), request.headers.get("content-type", ""))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array or NDJSON")
+    
+    if len(raw_events) > settings.EVENT_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.EVENT_BATCH_MAX_SIZE} events per batch"
+        )
+    
+    events = []
+    rejected = []
+    for index, raw_event in enumerate(raw_events):
+        event, error = validate_event(raw_event)
+        if error:
+            rejected.append({"index": index, "error": error})
+        else:
+            events.append(event)
+    
+    if events and not dispatcher.submit(events):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Event queue is full",
+            headers={"Retry-After": "1"}
+        )
+    
+    return {"accepted": len(events), "rejected": rejected}
+
+@app.post("/internal/presence", dependencies=[Depends(verify_internal_key)])
+async def get_presence(user_ids: List[int] = Body(..., embed=True)):
+    """Online state and last-seen time of many users at once"""
+    if len(user_ids) > settings.PRESENCE_QUERY_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.PRESENCE_QUERY_MAX} user ids per query"
+        )
+    return {"presence": await presence.is_online(user_ids)}
+
+@app.get("/internal/metrics", dependencies=[Depends(verify_internal_key)])
+async def get_metrics():
+    """Event ingest and delivery statistics for monitoring"""
+    return {
+        "events": dispatcher.stats(),
+        "coalescer": coalescer.stats(),
+        "outboxes": sio.manager.outboxes.stats(),
+        "encoded_packets": dict(sio.manager.encoded),
+        "replay": replay_buffer.stats(),
+        "presence": presence.stats(),
+        "admission": admission.stats(),
+        "routing": sio.manager.routing_stats() if hasattr(sio.manager, "routing_stats") else None,
+    }
+
+@app.on_event("startup")
+async def startup_event():
+    dispatcher.start()
+    coalescer.start()
+    presence.start()
+    if settings.EVENT_STREAM_ENABLED and settings.USE_REDIS:
+        app.state.stream_consumer = asyncio.create_task(consume_event_stream())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    stream_consumer = getattr(app.state, "stream_consumer", None)
+    if stream_consumer:
+        stream_consumer.cancel()
+    await dispatcher.stop()
+    await coalescer.stop()
+    await presence.stop()
+
 # Initialize Socket.IO with authentication middleware
+def _refuse(rejection: AdmissionRejected):
+    """Turn an admission rejection into a connect_error carrying a retry hint"""
+    return socketio.exceptions.ConnectionRefusedError(rejection.reason, {"retryAfter": rejection.retry_after})
+
 @sio.event
 async def connect(sid, environ, auth):
-    """Handle WebSocket connection with JWT authentication"""
+    """Handle WebSocket connection with admission control and JWT authentication"""
+    # Cheap checks first - a reconnect storm is shed before any JWT decoding
+    try:
+        admission.check_node(client_ip(environ))
+    except AdmissionRejected as rejection:
+        raise _refuse(rejection)
+    
     if not auth or 'token' not in auth:
         await sio.disconnect(sid)
         return False
@@ -35,18 +134,37 @@ async def connect(sid, environ, auth):
     try:
         # Validate the token and get the user information
         user_data = validate_token(auth['token'])
-        # Associate the user ID with the session
-        await sio.save_session(sid, {"user_id": user_data["sub"], "username": user_data.get("username", "")})
-        print(f"Client connected: {sid} - User: {user_data['sub']}")
-        return True
     except Exception as e:
         print(f"Authentication error: {str(e)}")
         await sio.disconnect(sid)
         return False
+    
+    try:
+        admission.check_user(user_data["sub"])
+    except AdmissionRejected as rejection:
+        raise _refuse(rejection)
+    
+    admission.connected(sid, user_data["sub"])
+    # Associate the user ID with the session
+    await sio.save_session(sid, {"user_id": user_data["sub"], "username": user_data.get("username", "")})
+    # Per-user room for targeted events (friend requests, friends' posts)
+    await register_connection(sid, user_data["sub"], encoding=negotiate(auth))
+    # A reconnecting client sends the last seq it saw; replay runs after
+    # the connect handshake has been sent
+    last_seq = auth.get('last_seq')
+    if isinstance(last_seq, int) and last_seq > 0:
+        task = asyncio.create_task(replay_missed_events(sid, user_data["sub"], last_seq))
+        _replay_tasks.add(task)
+        task.add_done_callback(_replay_tasks.discard)
+    print(f"Client connected: {sid} - User: {user_data['sub']}")
+    return True
 
 @sio.event
 async def disconnect(sid):
     """Handle client disconnect event"""
+    admission.disconnected(sid)
+    session = await sio.get_session(sid)
+    await unregister_connection(sid, session.get("user_id"))
     print(f"Client disconnected: {sid}")
 
 if __name__ == "__main__":
@@ -0,0 +1,135 @@
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from ..core.config import settings
+
+
+class AdmissionRejected(Exception):
+    """A connection attempt was turned away; retry_after is in seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets keyed by e.g. client IP. Buckets refill at `rate` tokens per
+    second up to `burst`; idle buckets are full anyway, so only the most
+    recently used max_keys are kept.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # key -> (tokens, last refill)
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def acquire(self, key: str) -> float:
+        """Take a token; returns 0 if allowed, else seconds until one is available"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            retry_after = 0.0
+        else:
+            self._buckets[key] = (tokens, now)
+            retry_after = (1 - tokens) / self.rate
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+class AdmissionController:
+    """
+    Decides whether a new socket may connect to this node: a cap on open
+    sockets, rate limits on new connections per client IP and per user, and
+    a cap on simultaneous sockets per user. The node-wide and IP checks run
+    before the JWT is decoded, so a reconnect storm is shed cheaply.
+    """
+
+    def __init__(self):
+        self.max_connections = settings.ADMISSION_MAX_CONNECTIONS
+        self.max_sockets_per_user = settings.ADMISSION_MAX_SOCKETS_PER_USER
+        self.retry_after_max = settings.ADMISSION_RETRY_AFTER_MAX
+        self.ip_limiter = TokenBucketLimiter(
+            settings.ADMISSION_IP_RATE, settings.ADMISSION_IP_BURST, settings.ADMISSION_MAX_TRACKED_KEYS
+        )
+        self.user_limiter = TokenBucketLimiter(
+            settings.ADMISSION_USER_RATE, settings.ADMISSION_USER_BURST, settings.ADMISSION_MAX_TRACKED_KEYS
+        )
+        # sid -> user_id, and user_id -> open sockets on this node
+        self._sockets: Dict[str, str] = {}
+        self._user_sockets: Dict[str, int] = {}
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {}
+
+    def _reject(self, reason: str, retry_after: float) -> None:
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        raise AdmissionRejected(reason, max(round(retry_after, 1), 0.1))
+
+    def _jittered(self) -> float:
+        # Spread clients that were turned away together over the retry window
+        return random.uniform(1, self.retry_after_max)
+
+    def check_node(self, client_ip: Optional[str]) -> None:
+        if len(self._sockets) >= self.max_connections:
+            self._reject("node at capacity", self._jittered())
+        if client_ip:
+            wait = self.ip_limiter.acquire(client_ip)
+            if wait:
+                self._reject("too many connections from this address", wait)
+
+    def check_user(self, user_id: Any) -> None:
+        user_id = str(user_id)
+        if self._user_sockets.get(user_id, 0) >= self.max_sockets_per_user:
+            self._reject("too many open connections for this user", self._jittered())
+        wait = self.user_limiter.acquire(user_id)
+        if wait:
+            self._reject("connecting too often", wait)
+
+    def connected(self, sid: str, user_id: Any) -> None:
+        user_id = str(user_id)
+        self._sockets[sid] = user_id
+        self._user_sockets[user_id] = self._user_sockets.get(user_id, 0) + 1
+        self.admitted += 1
+
+    def disconnected(self, sid: str) -> None:
+        user_id = self._sockets.pop(sid, None)
+        if user_id is None:
+            return
+        remaining = self._user_sockets.get(user_id, 0) - 1
+        if remaining > 0:
+            self._user_sockets[user_id] = remaining
+        else:
+            self._user_sockets.pop(user_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": len(self._sockets),
+            "max_connections": self.max_connections,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+        }
+
+
+def client_ip(environ: Dict[str, Any]) -> Optional[str]:
+    """
+    Client address of a connection. Behind the gateway the peer is the
+    gateway itself, so the right-most X-Forwarded-For entry (the one the
+    gateway appended) is used when ADMISSION_TRUST_FORWARDED is set.
+    """
+    if settings.ADMISSION_TRUST_FORWARDED:
+        forwarded = environ.get("HTTP_X_FORWARDED_FOR")
+        if forwarded:
+            return forwarded.split(",")[-1].strip()
+    return environ.get("REMOTE_ADDR")
+
+
+admission = AdmissionController()
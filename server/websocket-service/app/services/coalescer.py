@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EventCoalescer:
+    """
+    Per-post buffer for high-frequency events. Between flushes only the latest
+    like count of each post is kept, and comment bursts collapse into one
+    message carrying the newest comment and how many arrived. Every interval
+    the buffer is swapped out and each post is emitted once.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        emit_likes: Callable[..., Awaitable[None]],
+        emit_comments: Callable[..., Awaitable[None]],
+    ):
+        self.interval = interval
+        self._emit_likes = emit_likes
+        self._emit_comments = emit_comments
+        # post_id -> (likes_count, target), target being the emit's room
+        # arguments (author_id, is_private)
+        self._likes: Dict[Any, tuple] = {}
+        # post_id -> [latest comment, target, number of comments]
+        self._comments: Dict[Any, list] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.received = 0
+        self.emitted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def add_like(self, post_id, likes_count, target: Dict[str, Any]) -> None:
+        self.received += 1
+        self._likes[post_id] = (likes_count, target)
+
+    def add_comment(self, post_id, comment, target: Dict[str, Any]) -> None:
+        self.received += 1
+        pending = self._comments.get(post_id)
+        if pending is None:
+            self._comments[post_id] = [comment, target, 1]
+        else:
+            # The newest event's privacy wins, like its comment
+            pending[0] = comment
+            pending[1] = target
+            pending[2] += 1
+
+    async def flush(self) -> None:
+        likes, self._likes = self._likes, {}
+        comments, self._comments = self._comments, {}
+
+        for post_id, (likes_count, target) in likes.items():
+            try:
+                await self._emit_likes(post_id, likes_count, **target)
+                self.emitted += 1
+            except Exception as e:
+                logger.error(f"Error flushing likes for post {post_id}: {e}")
+
+        for post_id, (comment, target, count) in comments.items():
+            try:
+                await self._emit_comments(post_id, comment, comment_count=count, **target)
+                self.emitted += 1
+            except Exception as e:
+                logger.error(f"Error flushing comments for post {post_id}: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Don't lose whatever was buffered at shutdown
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self.interval,
+            "buffered_posts": len(self._likes) + len(self._comments),
+            "received": self.received,
+            "emitted": self.emitted,
+        }
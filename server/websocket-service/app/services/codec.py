@@ -0,0 +1,40 @@
+from typing import Any, Dict, Optional
+
+try:
+    import msgpack
+except ImportError:  # optional - without it every socket gets JSON
+    msgpack = None
+
+from ..core.config import settings
+
+JSON = "json"
+MSGPACK = "msgpack"
+
+# Field order of the compact array each event is packed as. Must match
+# EVENT_SCHEMAS in the client's websocketService.ts; append new fields at
+# the end so older clients keep decoding. Events without a schema (replay,
+# resync_required, ...) are always sent as JSON.
+EVENT_SCHEMAS = {
+    "new_post": ("seq", "id", "user_id", "username", "image_url", "caption", "is_private", "likes_count", "created_at"),
+    # userHasLiked is no longer sent; the slot stays so positions don't shift
+    "post_liked": ("postId", "likes", "userHasLiked"),
+    "new_comment": ("postId", "comment", "newComments"),
+    "new_friend_request": ("seq", "requesterId"),
+    "friend_request_accepted": ("seq", "addresseeId"),
+}
+
+
+def negotiate(auth: Optional[Dict[str, Any]]) -> str:
+    """Encoding for a new socket: msgpack only if asked for and available"""
+    requested = (auth or {}).get("encoding")
+    if requested == MSGPACK and msgpack is not None and settings.SOCKET_BINARY_ENABLED:
+        return MSGPACK
+    return JSON
+
+
+def encode_compact(event: str, data: Any) -> Optional[bytes]:
+    """Pack an event's payload as a positional array, or None to fall back to JSON"""
+    fields = EVENT_SCHEMAS.get(event)
+    if fields is None or not isinstance(data, dict):
+        return None
+    return msgpack.packb([data.get(field) for field in fields], use_bin_type=True)
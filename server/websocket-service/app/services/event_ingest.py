@@ -0,0 +1,159 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from .socket_manager import handle_post_event, handle_friendship_event
+
+logger = logging.getLogger(__name__)
+
+# Event type -> (handler, fields its data must carry)
+EVENT_TYPES = {
+    "new_post": (handle_post_event, ("user_id",)),
+    "post_liked": (handle_post_event, ("post_id", "likes_count", "author_id")),
+    "new_comment": (handle_post_event, ("post_id", "comment", "author_id")),
+    "new_friend_request": (handle_friendship_event, ("requester_id", "addressee_id")),
+    "friend_request_accepted": (handle_friendship_event, ("requester_id", "addressee_id")),
+}
+
+
+def validate_event(event: Any) -> Tuple[Optional[Tuple[str, Dict[str, Any]]], Optional[str]]:
+    """Cheap shape check of one {"type": ..., "data": {...}} envelope"""
+    if not isinstance(event, dict):
+        return None, "event must be an object"
+    event_type = event.get("type")
+    if event_type not in EVENT_TYPES:
+        return None, f"unknown event type: {event_type!r}"
+    data = event.get("data")
+    if not isinstance(data, dict):
+        return None, "data must be an object"
+    _, required = EVENT_TYPES[event_type]
+    missing = [field for field in required if field not in data]
+    if missing:
+        return None, f"missing fields: {', '.join(missing)}"
+    return (event_type, data), None
+
+
+def parse_events(body: bytes, content_type: str) -> List[Any]:
+    """Decode a JSON array (or single object) or an NDJSON body"""
+    if "ndjson" in content_type:
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+    decoded = json.loads(body)
+    return decoded if isinstance(decoded, list) else [decoded]
+
+
+class EventDispatcher:
+    """
+    Bounded queue of validated events drained by a few worker tasks, so
+    publishers get their response before any socket delivery happens.
+    """
+
+    def __init__(self, max_size: int, workers: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self.worker_count = workers
+        self._tasks: List[asyncio.Task] = []
+        self.accepted = 0
+        self.dispatched = 0
+        self.failed = 0
+        self.rejected_full = 0
+
+    def submit(self, events: List[Tuple[str, Dict[str, Any]]]) -> bool:
+        """Queue a whole batch, or nothing if it does not fit"""
+        if self.queue.maxsize and self.queue.qsize() + len(events) > self.queue.maxsize:
+            self.rejected_full += len(events)
+            return False
+        for event in events:
+            self.queue.put_nowait(event)
+        self.accepted += len(events)
+        return True
+
+    async def put(self, event: Tuple[str, Dict[str, Any]]) -> None:
+        """Queue one event, waiting for room (used by the stream consumer)"""
+        await self.queue.put(event)
+        self.accepted += 1
+
+    async def _worker(self) -> None:
+        while True:
+            event_type, data = await self.queue.get()
+            try:
+                handler, _ = EVENT_TYPES[event_type]
+                await handler(event_type, data)
+                self.dispatched += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error dispatching {event_type} event: {e}")
+            finally:
+                self.queue.task_done()
+
+    def start(self) -> None:
+        for _ in range(self.worker_count):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self.queue.qsize(),
+            "accepted": self.accepted,
+            "dispatched": self.dispatched,
+            "failed": self.failed,
+            "rejected_queue_full": self.rejected_full,
+        }
+
+
+dispatcher = EventDispatcher(
+    max_size=settings.EVENT_QUEUE_MAX_SIZE,
+    workers=settings.EVENT_DISPATCH_WORKERS,
+)
+
+
+async def consume_event_stream() -> None:
+    """
+    Read events from a Redis Stream consumer group and hand them to the
+    dispatcher. Each stream entry carries one envelope in its "event" field.
+    """
+    import redis.asyncio as redis
+    from redis.exceptions import ResponseError
+
+    client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+    consumer = f"{socket.gethostname()}-{os.getpid()}"
+    try:
+        await client.xgroup_create(settings.EVENT_STREAM_KEY, settings.EVENT_STREAM_GROUP, id="$", mkstream=True)
+    except ResponseError as e:
+        # BUSYGROUP - the group already exists
+        if "BUSYGROUP" not in str(e):
+            raise
+
+    while True:
+        try:
+            response = await client.xreadgroup(
+                settings.EVENT_STREAM_GROUP,
+                consumer,
+                {settings.EVENT_STREAM_KEY: ">"},
+                count=100,
+                block=5000,
+            )
+            for _, entries in response or []:
+                for entry_id, fields in entries:
+                    try:
+                        event, error = validate_event(json.loads(fields.get("event", "null")))
+                    except ValueError:
+                        event, error = None, "invalid JSON"
+                    if error:
+                        logger.warning(f"Skipping stream entry {entry_id}: {error}")
+                    else:
+                        await dispatcher.put(event)
+                    await client.xack(settings.EVENT_STREAM_KEY, settings.EVENT_STREAM_GROUP, entry_id)
+        except asyncio.CancelledError:
+            await client.close()
+            raise
+        except Exception as e:
+            logger.error(f"Event stream consumer error: {e}")
+            await asyncio.sleep(1)
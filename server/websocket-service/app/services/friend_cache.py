@@ -0,0 +1,113 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+import httpx
+
+from ..core.config import settings
+
+
+class SocketFriendCache:
+    """
+    Friend-id sets for socket delivery and authorization.
+
+    Authorization checks (post rooms, presence) look the pair up in the
+    connected user's own set - friendship is symmetric, so one set per online
+    user answers for every author on their screen. Fan-out of new posts reads
+    the author's set. Sets are revalidated against the friendship service's
+    /friend-ids ETag after FRIEND_IDS_FRESH_SECONDS. When the friendship
+    service is unreachable, a stale set is still used for fan-out, but only
+    up to FRIEND_IDS_MAX_STALE_SECONDS for authorization; past that, and for
+    unknown users, authorization fails closed.
+    """
+
+    def __init__(self, max_size: int, fresh_seconds: float, max_stale_seconds: float):
+        self.max_size = max_size
+        self.fresh_seconds = fresh_seconds
+        self.max_stale_seconds = max_stale_seconds
+        # user_id -> (friend ids, etag, validated_at)
+        self._entries: "OrderedDict[int, Tuple[FrozenSet[int], Optional[str], float]]" = OrderedDict()
+        self.hits = 0
+        self.revalidations = 0
+        self.not_modified = 0
+        self.fetches = 0
+        self.errors = 0
+        self.stale_denials = 0
+
+    def _store(self, user_id: int, friend_ids: FrozenSet[int], etag: Optional[str]) -> None:
+        self._entries[user_id] = (friend_ids, etag, time.monotonic())
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def _lookup(self, user_id: int) -> Tuple[FrozenSet[int], float]:
+        """Friend ids of a user and when they were last confirmed (0 if never)"""
+        entry = self._entries.get(user_id)
+        if entry is not None and time.monotonic() - entry[2] < self.fresh_seconds:
+            self.hits += 1
+            self._entries.move_to_end(user_id)
+            return entry[0], entry[2]
+
+        headers = {"X-Internal-Key": settings.INTERNAL_API_KEY}
+        if entry is not None and entry[1]:
+            headers["If-None-Match"] = entry[1]
+            self.revalidations += 1
+        else:
+            self.fetches += 1
+
+        try:
+            async with httpx.AsyncClient(timeout=2.0) as client:
+                response = await client.get(
+                    f"{settings.FRIENDSHIP_SERVICE_URL}/friend-ids/{user_id}",
+                    headers=headers
+                )
+        except httpx.RequestError:
+            response = None
+
+        if response is not None and response.status_code == 304 and entry is not None:
+            self.not_modified += 1
+            self._store(user_id, entry[0], entry[1])
+            return entry[0], time.monotonic()
+
+        if response is None or response.status_code != 200:
+            self.errors += 1
+            return (entry[0], entry[2]) if entry is not None else (frozenset(), 0.0)
+
+        friend_ids = frozenset(response.json().get("friend_ids", []))
+        self._store(user_id, friend_ids, response.headers.get("ETag"))
+        return friend_ids, time.monotonic()
+
+    async def get_friend_ids(self, user_id: int) -> FrozenSet[int]:
+        """Friends of a user for fan-out; the last known set if unreachable"""
+        friend_ids, _ = await self._lookup(user_id)
+        return friend_ids
+
+    async def is_friend(self, user_id: Any, other_id: Any) -> bool:
+        """Whether other_id is a friend of user_id, failing closed on stale data"""
+        try:
+            user_id, other_id = int(user_id), int(other_id)
+        except (TypeError, ValueError):
+            return False
+        friend_ids, validated_at = await self._lookup(user_id)
+        if time.monotonic() - validated_at > self.max_stale_seconds:
+            self.stale_denials += 1
+            return False
+        return other_id in friend_ids
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "not_modified": self.not_modified,
+            "fetches": self.fetches,
+            "errors": self.errors,
+            "stale_denials": self.stale_denials,
+        }
+
+
+friend_cache = SocketFriendCache(
+    max_size=settings.FRIEND_IDS_CACHE_MAX_SIZE,
+    fresh_seconds=settings.FRIEND_IDS_FRESH_SECONDS,
+    max_stale_seconds=settings.FRIEND_IDS_MAX_STALE_SECONDS,
+)
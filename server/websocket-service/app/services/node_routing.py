@@ -0,0 +1,191 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List
+
+import redis.asyncio as redis
+
+from .outbox import OutboxManager, OutboxRedisManager
+
+logger = logging.getLogger(__name__)
+
+USER_ROOM_PREFIX = "user:"
+
+
+class NodeRoutes:
+    """
+    Which nodes host sockets of which users. Every user with a socket on this
+    node has a field <node_id> = expiry in the hash <prefix>:user:<id>; the
+    fields are refreshed by a heartbeat, so routes of a crashed node expire
+    on their own.
+    """
+
+    def __init__(self, client, node_id: str, ttl_seconds: int, prefix: str):
+        self._client = client
+        self.node_id = node_id
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        # user_id -> number of this node's sockets of that user
+        self._local: Dict[str, int] = {}
+
+    def _key(self, user_id: Any) -> str:
+        return f"{self.prefix}:user:{user_id}"
+
+    def _announce(self, pipe, user_id: str) -> None:
+        key = self._key(user_id)
+        pipe.hset(key, self.node_id, int(time.time()) + self.ttl_seconds)
+        pipe.expire(key, self.ttl_seconds)
+
+    async def connected(self, user_id: Any) -> None:
+        user_id = str(user_id)
+        self._local[user_id] = self._local.get(user_id, 0) + 1
+        if self._local[user_id] == 1:
+            async with self._client.pipeline(transaction=False) as pipe:
+                self._announce(pipe, user_id)
+                await pipe.execute()
+
+    async def disconnected(self, user_id: Any) -> None:
+        user_id = str(user_id)
+        remaining = self._local.get(user_id, 0) - 1
+        if remaining > 0:
+            self._local[user_id] = remaining
+            return
+        self._local.pop(user_id, None)
+        await self._client.hdel(self._key(user_id), self.node_id)
+
+    async def heartbeat(self) -> None:
+        async with self._client.pipeline(transaction=False) as pipe:
+            for user_id in list(self._local):
+                self._announce(pipe, user_id)
+            await pipe.execute()
+
+    async def lookup(self, user_ids: List[str]) -> Dict[str, List[str]]:
+        """Group user ids by the nodes currently hosting them"""
+        async with self._client.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.hgetall(self._key(user_id))
+            routes = await pipe.execute()
+
+        now = time.time()
+        by_node: Dict[str, List[str]] = defaultdict(list)
+        for user_id, nodes in zip(user_ids, routes):
+            for node_id, expires_at in nodes.items():
+                if float(expires_at) > now:
+                    by_node[node_id].append(user_id)
+        return by_node
+
+    @property
+    def local_users(self) -> int:
+        return len(self._local)
+
+
+class NodeAwareRedisManager(OutboxRedisManager):
+    """
+    Redis manager that sends emits aimed at user rooms only to the nodes
+    hosting those users, on a per-node channel, instead of publishing them to
+    every node. Users with no live route are offline and are skipped; they
+    catch up through the replay buffer. Emits to any other room and
+    broadcasts go through the regular pub/sub channel.
+    """
+
+    def __init__(self, url: str, route_ttl_seconds: int = 30, prefix: str = "everstory:socket-routes", **kwargs):
+        super().__init__(url, **kwargs)
+        self.node_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.prefix = prefix
+        self._route_client = redis.from_url(url, decode_responses=True)
+        self.routes = NodeRoutes(self._route_client, self.node_id, route_ttl_seconds, prefix)
+        self.delivered_local = 0
+        self.published_to_nodes = 0
+        self.skipped_offline = 0
+
+    def _node_channel(self, node_id: str) -> str:
+        return f"{self.prefix}:node:{node_id}"
+
+    def initialize(self):
+        super().initialize()
+        if not self.write_only:
+            self.server.start_background_task(self._node_listen)
+            self.server.start_background_task(self._heartbeat)
+
+    async def emit(self, event, data, namespace=None, room=None, skip_sid=None, callback=None, to=None, **kwargs):
+        target = to or room
+        if target is None or callback is not None or kwargs.get("ignore_queue"):
+            return await super().emit(
+                event, data, namespace=namespace, room=room, skip_sid=skip_sid, callback=callback, to=to, **kwargs
+            )
+
+        namespace = namespace or "/"
+        rooms = target if isinstance(target, list) else [target]
+        user_ids = [r[len(USER_ROOM_PREFIX):] for r in rooms if isinstance(r, str) and r.startswith(USER_ROOM_PREFIX)]
+        other_rooms = [r for r in rooms if not (isinstance(r, str) and r.startswith(USER_ROOM_PREFIX))]
+
+        if other_rooms:
+            await super().emit(event, data, namespace=namespace, room=other_rooms, skip_sid=skip_sid)
+        if not user_ids:
+            return
+
+        by_node = await self.routes.lookup(user_ids)
+        self.skipped_offline += len(set(user_ids) - {u for ids in by_node.values() for u in ids})
+        for node_id, node_user_ids in by_node.items():
+            node_rooms = [USER_ROOM_PREFIX + user_id for user_id in node_user_ids]
+            if node_id == self.node_id:
+                self.delivered_local += 1
+                await OutboxManager.emit(self, event, data, namespace, room=node_rooms, skip_sid=skip_sid)
+            else:
+                self.published_to_nodes += 1
+                await self._route_client.publish(self._node_channel(node_id), json.dumps({
+                    "event": event,
+                    "data": data,
+                    "namespace": namespace,
+                    "rooms": node_rooms,
+                    "skip_sid": skip_sid,
+                }))
+
+    async def _node_listen(self) -> None:
+        """Deliver emits other nodes routed to this node"""
+        while True:
+            pubsub = self._route_client.pubsub()
+            try:
+                await pubsub.subscribe(self._node_channel(self.node_id))
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    payload = json.loads(message["data"])
+                    await OutboxManager.emit(
+                        self,
+                        payload["event"],
+                        payload["data"],
+                        payload["namespace"],
+                        room=payload["rooms"],
+                        skip_sid=payload.get("skip_sid"),
+                    )
+            except asyncio.CancelledError:
+                await pubsub.close()
+                raise
+            except Exception as e:
+                logger.error(f"Node channel listener error: {e}")
+                await pubsub.close()
+                await asyncio.sleep(1)
+
+    async def _heartbeat(self) -> None:
+        interval = max(self.routes.ttl_seconds / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.routes.heartbeat()
+            except Exception as e:
+                logger.error(f"Route heartbeat failed: {e}")
+
+    def routing_stats(self) -> Dict[str, Any]:
+        return {
+            "node_id": self.node_id,
+            "local_users": self.routes.local_users,
+            "delivered_local": self.delivered_local,
+            "published_to_nodes": self.published_to_nodes,
+            "skipped_offline": self.skipped_offline,
+        }
@@ -0,0 +1,248 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import socketio
+from engineio import packet as eio_packet
+
+from ..core.config import settings
+from .codec import JSON, MSGPACK, encode_compact
+
+logger = logging.getLogger(__name__)
+
+# Outbox policy per event type: "merge" replaces a queued event for the same
+# key (only the latest value matters), anything else drops the oldest entry
+# when the outbox is full. Events carrying a replay seq are never dropped, as
+# a later one would move the client's lastSeq past the gap, and neither are
+# the replay batches and resync notices that close such gaps: the oldest
+# other entry goes instead, and with none left the socket is evicted and
+# catches up through replay when it reconnects.
+MERGE_KEYS = {
+    "post_liked": "postId",
+}
+UNDROPPABLE_EVENTS = {"replay", "resync_required"}
+
+
+class ConnectionOutbox:
+    """Bounded queue of encoded packets waiting to be handed to one socket"""
+
+    def __init__(self, sid: str, eio_sid: str):
+        self.sid = sid
+        self.eio_sid = eio_sid
+        self.entries: deque = deque()
+        # merge key -> entry still waiting in the queue
+        self.merge_index: Dict[Any, list] = {}
+        self.over_high_water_since: Optional[float] = None
+        self.drain_task: Optional[asyncio.Task] = None
+
+
+class OutboxRegistry:
+    """
+    Per-connection outboxes with drop-oldest / merge policies.
+
+    A drain task forwards packets to engine.io only while the socket's transport
+    queue is below SOCKET_TRANSPORT_QUEUE_LIMIT, so a stalled client backs up
+    here, where the queue is bounded, instead of in engine.io's unbounded queue.
+    Clients that stay above SOCKET_QUEUE_HIGH_WATER for longer than
+    SOCKET_SLOW_CONSUMER_SECONDS are disconnected.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.outboxes: Dict[str, ConnectionOutbox] = {}
+        # Evicted sockets whose disconnect is still in progress - nothing more
+        # may reach them, or they'd skip what was discarded
+        self._evicting: set = set()
+        self.max_size = settings.SOCKET_QUEUE_MAX_SIZE
+        self.high_water = settings.SOCKET_QUEUE_HIGH_WATER
+        self.slow_consumer_seconds = settings.SOCKET_SLOW_CONSUMER_SECONDS
+        self.transport_limit = settings.SOCKET_TRANSPORT_QUEUE_LIMIT
+        self.enqueued = 0
+        self.merged = 0
+        self.dropped = 0
+        self.evicted = 0
+
+    def enqueue(self, sid: str, eio_sid: str, event: str, data: List[Any], packets: List[Any]) -> None:
+        if sid in self._evicting:
+            return
+        outbox = self.outboxes.get(sid)
+        if outbox is None:
+            outbox = self.outboxes[sid] = ConnectionOutbox(sid, eio_sid)
+
+        merge_field = MERGE_KEYS.get(event)
+        merge_key = None
+        if merge_field and data and isinstance(data[0], dict):
+            merge_key = (event, data[0].get(merge_field))
+            queued = outbox.merge_index.get(merge_key)
+            if queued is not None:
+                # Same post still waiting - just swap in the newer payload
+                queued[1] = packets
+                self.merged += 1
+                return
+
+        if len(outbox.entries) >= self.max_size:
+            droppable = next((i for i, queued in enumerate(outbox.entries) if not queued[2]), None)
+            if droppable is None:
+                self._evict(outbox, "outbox full of replayable events")
+                return
+            oldest = outbox.entries[droppable]
+            del outbox.entries[droppable]
+            if oldest[0] is not None:
+                outbox.merge_index.pop(oldest[0], None)
+            self.dropped += 1
+
+        keep = event in UNDROPPABLE_EVENTS or (bool(data) and isinstance(data[0], dict) and "seq" in data[0])
+        entry = [merge_key, packets, keep]
+        outbox.entries.append(entry)
+        if merge_key is not None:
+            outbox.merge_index[merge_key] = entry
+        self.enqueued += 1
+
+        self._check_slow_consumer(outbox)
+        if outbox.drain_task is None:
+            outbox.drain_task = asyncio.create_task(self._drain(outbox))
+
+    def _check_slow_consumer(self, outbox: ConnectionOutbox) -> None:
+        if len(outbox.entries) < self.high_water:
+            outbox.over_high_water_since = None
+            return
+        now = time.monotonic()
+        if outbox.over_high_water_since is None:
+            outbox.over_high_water_since = now
+        elif now - outbox.over_high_water_since > self.slow_consumer_seconds:
+            self._evict(outbox, "slow consumer")
+
+    def _evict(self, outbox: ConnectionOutbox, reason: str) -> None:
+        self.evicted += 1
+        logger.warning(f"Disconnecting {outbox.sid}: {reason} ({len(outbox.entries)} queued)")
+        self._evicting.add(outbox.sid)
+        self.outboxes.pop(outbox.sid, None)
+        if outbox.drain_task is not None:
+            outbox.drain_task.cancel()
+        asyncio.create_task(self.manager.server.disconnect(outbox.sid))
+
+    def _transport_backlog(self, eio_sid: str) -> Optional[int]:
+        eio_socket = self.manager.server.eio.sockets.get(eio_sid)
+        if eio_socket is None:
+            return None
+        return eio_socket.queue.qsize()
+
+    async def _drain(self, outbox: ConnectionOutbox) -> None:
+        try:
+            while outbox.entries:
+                backlog = self._transport_backlog(outbox.eio_sid)
+                if backlog is None:
+                    # Socket is gone
+                    self.remove(outbox.sid)
+                    return
+                if backlog >= self.transport_limit:
+                    await asyncio.sleep(0.05)
+                    continue
+
+                merge_key, packets, _ = outbox.entries.popleft()
+                if merge_key is not None:
+                    outbox.merge_index.pop(merge_key, None)
+                if len(outbox.entries) < self.high_water:
+                    outbox.over_high_water_since = None
+                for pkt in packets:
+                    await self.manager.server._send_eio_packet(outbox.eio_sid, pkt)
+        except Exception as e:
+            logger.error(f"Error draining outbox for {outbox.sid}: {e}")
+        finally:
+            outbox.drain_task = None
+
+    def remove(self, sid: str) -> None:
+        self._evicting.discard(sid)
+        outbox = self.outboxes.pop(sid, None)
+        if outbox is not None and outbox.drain_task is not None:
+            outbox.drain_task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        depths = [len(outbox.entries) for outbox in self.outboxes.values()]
+        return {
+            "connections_with_outbox": len(depths),
+            "queued": sum(depths),
+            "max_depth": max(depths, default=0),
+            "over_high_water": sum(1 for depth in depths if depth >= self.high_water),
+            "enqueued": self.enqueued,
+            "merged": self.merged,
+            "dropped": self.dropped,
+            "evicted": self.evicted,
+        }
+
+
+class OutboxManager(socketio.AsyncManager):
+    """
+    Client manager that routes every callback-free emit through the
+    per-connection outboxes. The packet is encoded once per emit and payload
+    encoding (JSON or msgpack) and shared by all recipients using it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.outboxes = OutboxRegistry(self)
+        # sid -> payload encoding, only for sockets that negotiated msgpack
+        self.encodings: Dict[str, str] = {}
+        self.encoded = {JSON: 0, MSGPACK: 0}
+
+    def set_encoding(self, sid: str, encoding: str) -> None:
+        if encoding == JSON:
+            self.encodings.pop(sid, None)
+        else:
+            self.encodings[sid] = encoding
+
+    def _packets_for(self, encoding: str, event, data, namespace) -> List[Any]:
+        if encoding == MSGPACK:
+            compact = encode_compact(event, data[0]) if len(data) == 1 else None
+            if compact is not None:
+                self.encoded[MSGPACK] += 1
+                # bytes go out as a binary attachment
+                return self.encode_event(event, [compact], namespace)
+        self.encoded[JSON] += 1
+        return self.encode_event(event, data, namespace)
+
+    def encode_event(self, event, data, namespace) -> List[Any]:
+        pkt = self.server.packet_class(self.server.packet_class.EVENT, namespace=namespace, data=[event] + data)
+        encoded_packet = pkt.encode()
+        if not isinstance(encoded_packet, list):
+            encoded_packet = [encoded_packet]
+        return [eio_packet.Packet(eio_packet.MESSAGE, p) for p in encoded_packet]
+
+    async def emit(self, event, data, namespace, room=None, skip_sid=None, callback=None, to=None, **kwargs):
+        if callback is not None:
+            # Callbacks need a unique id per recipient - use the stock path
+            return await super().emit(
+                event, data, namespace, room=room, skip_sid=skip_sid, callback=callback, to=to, **kwargs
+            )
+
+        room = to or room
+        if namespace not in self.rooms:
+            return
+        if isinstance(data, tuple):
+            data = list(data)
+        elif data is not None:
+            data = [data]
+        else:
+            data = []
+        if not isinstance(skip_sid, list):
+            skip_sid = [skip_sid]
+
+        packets_by_encoding: Dict[str, List[Any]] = {}
+        for sid, eio_sid in self.get_participants(namespace, room):
+            if sid in skip_sid:
+                continue
+            encoding = self.encodings.get(sid, JSON)
+            packets = packets_by_encoding.get(encoding)
+            if packets is None:
+                packets = packets_by_encoding[encoding] = self._packets_for(encoding, event, data, namespace)
+            self.outboxes.enqueue(sid, eio_sid, event, data, packets)
+
+
+class OutboxRedisManager(socketio.AsyncRedisManager, OutboxManager):
+    """
+    Redis pub/sub manager whose local delivery (after a message comes back
+    from Redis) goes through the outboxes. The MRO places OutboxManager
+    between AsyncPubSubManager and AsyncManager for exactly that.
+    """
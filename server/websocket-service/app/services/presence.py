@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Presence:
+    """
+    Who is online. Each node counts its own sockets per user; with Redis
+    enabled every node also writes last-seen timestamps of its users into one
+    sorted set (member = user id, score = unix time), refreshed by a
+    heartbeat. A user is online while their score is within
+    PRESENCE_TTL_SECONDS, so a user whose last socket closed shows as online
+    for at most that long. Without Redis only this node's sockets are known.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int,
+        heartbeat_seconds: int,
+        retention_seconds: int,
+        redis_url: Optional[str] = None,
+        key: str = "everstory:presence",
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.retention_seconds = retention_seconds
+        self.key = key
+        # user_id -> number of sockets on this node
+        self._local: Dict[str, int] = {}
+        self._client = None
+        if redis_url:
+            import redis.asyncio as redis
+
+            self._client = redis.from_url(redis_url, decode_responses=True)
+        self._task: Optional[asyncio.Task] = None
+        self.queries = 0
+
+    async def _touch(self, user_ids: List[str]) -> None:
+        if self._client is None or not user_ids:
+            return
+        now = time.time()
+        try:
+            await self._client.zadd(self.key, {user_id: now for user_id in user_ids})
+        except Exception as e:
+            logger.error(f"Presence update failed: {e}")
+
+    async def connected(self, user_id: Any) -> None:
+        user_id = str(user_id)
+        self._local[user_id] = self._local.get(user_id, 0) + 1
+        if self._local[user_id] == 1:
+            await self._touch([user_id])
+
+    async def disconnected(self, user_id: Any) -> None:
+        user_id = str(user_id)
+        remaining = self._local.get(user_id, 0) - 1
+        if remaining > 0:
+            self._local[user_id] = remaining
+            return
+        self._local.pop(user_id, None)
+        # Record when the user was last seen on this node
+        await self._touch([user_id])
+
+    async def is_online(self, user_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        """Presence of many users in one round trip: {id: {online, last_seen}}"""
+        self.queries += 1
+        user_ids = [str(user_id) for user_id in user_ids]
+        if self._client is None:
+            return {
+                user_id: {"online": user_id in self._local, "last_seen": None}
+                for user_id in user_ids
+            }
+
+        try:
+            scores = await self._client.zmscore(self.key, user_ids) if user_ids else []
+        except Exception as e:
+            logger.error(f"Presence query failed: {e}")
+            scores = [None] * len(user_ids)
+
+        cutoff = time.time() - self.ttl_seconds
+        return {
+            user_id: {
+                "online": user_id in self._local or (score is not None and score >= cutoff),
+                "last_seen": score,
+            }
+            for user_id, score in zip(user_ids, scores)
+        }
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            await self._touch(list(self._local))
+            try:
+                # Forget users not seen within the retention window
+                await self._client.zremrangebyscore(self.key, "-inf", time.time() - self.retention_seconds)
+            except Exception as e:
+                logger.error(f"Presence pruning failed: {e}")
+
+    def start(self) -> None:
+        if self._client is not None and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis" if self._client is not None else "memory",
+            "local_users": len(self._local),
+            "local_sockets": sum(self._local.values()),
+            "queries": self.queries,
+        }
+
+
+presence = Presence(
+    ttl_seconds=settings.PRESENCE_TTL_SECONDS,
+    heartbeat_seconds=settings.PRESENCE_HEARTBEAT_SECONDS,
+    retention_seconds=settings.PRESENCE_RETENTION_SECONDS,
+    redis_url=settings.REDIS_URL if settings.USE_REDIS else None,
+)
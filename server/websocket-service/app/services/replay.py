@@ -0,0 +1,205 @@
+import json
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..core.config import settings
+
+# One replayable event: (seq, event name, payload)
+Entry = Tuple[int, str, Dict[str, Any]]
+
+
+class UserRing:
+    """Last few events of one user plus what is needed to detect a gap"""
+
+    __slots__ = ("entries", "floor", "last")
+
+    def __init__(self, size: int):
+        self.entries: deque = deque(maxlen=size)
+        # Highest seq pushed out of the ring, and highest seq ever recorded
+        self.floor = 0
+        self.last = 0
+
+
+class ReplayBuffer:
+    """
+    Per-user ring buffers of recent targeted events.
+
+    Sequence numbers come from one process-wide clock, seeded from the wall
+    clock so they keep increasing across restarts. They are global rather
+    than per user so a broadcast carries the same payload to every recipient
+    and is still encoded once; each user's events are still strictly
+    increasing. Process-local, so only suitable for a single node - use the
+    Redis buffer when running several.
+    """
+
+    def __init__(self, size: int, max_users: int):
+        self.size = size
+        self.max_users = max_users
+        self._clock = time.time_ns() // 1000
+        self.started_seq = self._clock
+        # Highest seq that belonged to a user whose ring was evicted
+        self._lost_floor = 0
+        self._rings: "OrderedDict[str, UserRing]" = OrderedDict()
+        self.replays = 0
+        self.resyncs = 0
+
+    async def next_seq(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    async def record(self, user_ids: Iterable[Any], seq: int, event: str, data: Dict[str, Any]) -> None:
+        for user_id in user_ids:
+            key = str(user_id)
+            ring = self._rings.get(key)
+            if ring is None:
+                ring = self._rings[key] = UserRing(self.size)
+                # The user may have had a ring that was evicted; events older
+                # than anything evicted can't be vouched for
+                ring.floor = self._lost_floor
+            else:
+                self._rings.move_to_end(key)
+            if len(ring.entries) == ring.entries.maxlen:
+                ring.floor = ring.entries[0][0]
+            ring.entries.append((seq, event, data))
+            ring.last = seq
+        while len(self._rings) > self.max_users:
+            _, evicted = self._rings.popitem(last=False)
+            self._lost_floor = max(self._lost_floor, evicted.last)
+
+    async def since(self, user_id: Any, last_seq: int) -> Optional[List[Entry]]:
+        """Events after last_seq, or None if some of them are no longer known"""
+        if last_seq > self._clock:
+            # Never handed out - the client saw seqs from another clock
+            self.resyncs += 1
+            return None
+        ring = self._rings.get(str(user_id))
+        if ring is None:
+            if last_seq < self.started_seq or last_seq < self._lost_floor:
+                self.resyncs += 1
+                return None
+            return []
+        if ring.floor > last_seq or last_seq < self.started_seq:
+            self.resyncs += 1
+            return None
+        self.replays += 1
+        return [entry for entry in ring.entries if entry[0] > last_seq]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "users": len(self._rings),
+            "seq": self._clock,
+            "replays": self.replays,
+            "resyncs": self.resyncs,
+        }
+
+
+# Append one entry to a user's ring, remembering the highest seq trimmed off
+# (floor) and the newest seq recorded (last) for gap detection
+_APPEND_SCRIPT = """
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[2])
+local excess = redis.call('ZCARD', KEYS[1]) - tonumber(ARGV[3])
+if excess > 0 then
+    local dropped = redis.call('ZRANGE', KEYS[1], excess - 1, excess - 1, 'WITHSCORES')
+    redis.call('HSET', KEYS[2], 'floor', dropped[2])
+    redis.call('ZREMRANGEBYRANK', KEYS[1], 0, excess - 1)
+end
+redis.call('HSET', KEYS[2], 'last', ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+"""
+
+
+# Advance the shared seq clock, never below the caller's wall clock in
+# microseconds, so it keeps increasing even if the key is lost
+_NEXT_SEQ_SCRIPT = """
+local seq = redis.call('INCR', KEYS[1])
+local now = tonumber(ARGV[1])
+if seq < now then
+    redis.call('SET', KEYS[1], ARGV[1])
+    return now
+end
+return seq
+"""
+
+
+class RedisReplayBuffer:
+    """
+    Replay buffer shared by all nodes. Each user has a sorted set of entries
+    (score = seq) that expires after REPLAY_TTL_SECONDS of inactivity and a
+    small hash with floor/last that lives longer, so an expired ring is still
+    recognised as a gap. Seqs come from one Redis counter that is clamped to
+    wall-clock microseconds, like the in-memory clock.
+    """
+
+    def __init__(self, url: str, size: int, ttl_seconds: int, meta_ttl_seconds: int, prefix: str = "everstory:replay"):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url, decode_responses=True)
+        self._append = self._client.register_script(_APPEND_SCRIPT)
+        self._next_seq = self._client.register_script(_NEXT_SEQ_SCRIPT)
+        self.size = size
+        self.ttl_seconds = ttl_seconds
+        self.meta_ttl_seconds = meta_ttl_seconds
+        self.prefix = prefix
+        self.replays = 0
+        self.resyncs = 0
+
+    def _keys(self, user_id: Any) -> List[str]:
+        return [f"{self.prefix}:{user_id}:ring", f"{self.prefix}:{user_id}:meta"]
+
+    async def next_seq(self) -> int:
+        return int(await self._next_seq(keys=[f"{self.prefix}:seq"], args=[time.time_ns() // 1000]))
+
+    async def record(self, user_ids: Iterable[Any], seq: int, event: str, data: Dict[str, Any]) -> None:
+        member = json.dumps([seq, event, data], separators=(",", ":"))
+        async with self._client.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                await self._append(
+                    keys=self._keys(user_id),
+                    args=[seq, member, self.size, self.ttl_seconds, self.meta_ttl_seconds],
+                    client=pipe,
+                )
+            await pipe.execute()
+
+    async def since(self, user_id: Any, last_seq: int) -> Optional[List[Entry]]:
+        ring_key, meta_key = self._keys(user_id)
+        async with self._client.pipeline(transaction=False) as pipe:
+            pipe.get(f"{self.prefix}:seq")
+            pipe.hgetall(meta_key)
+            pipe.zrangebyscore(ring_key, f"({last_seq}", "+inf")
+            head, meta, members = await pipe.execute()
+
+        if last_seq > int(head or 0):
+            # Never handed out - the client saw seqs from another clock
+            self.resyncs += 1
+            return None
+        if not meta:
+            # Nothing recorded within the metadata TTL - history unknown
+            self.resyncs += 1
+            return None
+        entries = [tuple(json.loads(member)) for member in members]
+        if int(meta.get("floor", 0)) > last_seq or (not entries and int(meta.get("last", 0)) > last_seq):
+            self.resyncs += 1
+            return None
+        self.replays += 1
+        return entries
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis",
+            "replays": self.replays,
+            "resyncs": self.resyncs,
+        }
+
+
+if settings.REPLAY_REDIS_ENABLED:
+    replay_buffer = RedisReplayBuffer(
+        settings.REDIS_URL,
+        size=settings.REPLAY_BUFFER_SIZE,
+        ttl_seconds=settings.REPLAY_TTL_SECONDS,
+        meta_ttl_seconds=settings.REPLAY_META_TTL_SECONDS,
+    )
+else:
+    replay_buffer = ReplayBuffer(size=settings.REPLAY_BUFFER_SIZE, max_users=settings.REPLAY_MAX_USERS)
@@ -1,19 +1,41 @@
+import logging
 import socketio
-import httpx
 from ..core.config import settings
+from .coalescer import EventCoalescer
+from .friend_cache import friend_cache
+from .outbox import OutboxManager, OutboxRedisManager
+from .node_routing import NodeAwareRedisManager
+from .replay import replay_buffer
+from .presence import presence
+from .codec import JSON
+
+logger = logging.getLogger(__name__)
 
 # Create a Socket.IO server instance
-# Use Redis adapter if configured for multi-server scaling
-if settings.USE_REDIS:
+# Use Redis adapter if configured for multi-server scaling. Both managers
+# deliver through bounded per-connection outboxes (see services/outbox.py)
+if settings.USE_REDIS and settings.NODE_ROUTING_ENABLED and not settings.REPLAY_REDIS_ENABLED:
+    # Node routing skips users without a live route, which is only safe when
+    # every node can replay what they missed
+    logger.warning("NODE_ROUTING_ENABLED requires REPLAY_REDIS_ENABLED - publishing emits to all nodes instead")
+
+if settings.USE_REDIS and settings.NODE_ROUTING_ENABLED and settings.REPLAY_REDIS_ENABLED:
     sio = socketio.AsyncServer(
         async_mode="asgi",
         cors_allowed_origins=settings.CORS_ORIGINS,
-        client_manager=socketio.AsyncRedisManager(settings.REDIS_URL)
+        client_manager=NodeAwareRedisManager(settings.REDIS_URL, route_ttl_seconds=settings.NODE_ROUTE_TTL_SECONDS)
+    )
+elif settings.USE_REDIS:
+    sio = socketio.AsyncServer(
+        async_mode="asgi",
+        cors_allowed_origins=settings.CORS_ORIGINS,
+        client_manager=OutboxRedisManager(settings.REDIS_URL)
     )
 else:
     sio = socketio.AsyncServer(
         async_mode="asgi",
-        cors_allowed_origins=settings.CORS_ORIGINS
+        cors_allowed_origins=settings.CORS_ORIGINS,
+        client_manager=OutboxManager()
     )
 
 socket_app = socketio.ASGIApp(sio)
@@ -25,53 +47,156 @@ class SocketEvents:
     NEW_COMMENT = 'new_comment'
     NEW_FRIEND_REQUEST = 'new_friend_request'
     FRIEND_REQUEST_ACCEPTED = 'friend_request_accepted'
+    REPLAY = 'replay'
+    RESYNC_REQUIRED = 'resync_required'
+
+def user_room(user_id) -> str:
+    """Room every socket of a user joins on connect"""
+    return f"user:{user_id}"
+
+def post_room(post_id) -> str:
+    """
+    Open room of the sockets currently showing a post. Any subscriber may
+    join it; only events of public posts are sent to it.
+    """
+    return f"post:{post_id}"
+
+def private_post_room(author_id, post_id) -> str:
+    """
+    Room for events of a private post, joined only by the author and the
+    author's friends. The author is part of the name so a subscription
+    authorized against one author can't be pointed at another author's post.
+    """
+    return f"post:{author_id}:{post_id}"
+
+def _post_event_room(post_id, author_id, is_private) -> str:
+    # Privacy comes from the image service's event, never from a client
+    return private_post_room(author_id, post_id) if is_private else post_room(post_id)
+
+async def register_connection(sid, user_id, encoding=JSON):
+    """Put a new socket in its user's room and advertise the route"""
+    sio.manager.set_encoding(sid, encoding)
+    await sio.enter_room(sid, user_room(user_id))
+    await presence.connected(user_id)
+    if isinstance(sio.manager, NodeAwareRedisManager):
+        await sio.manager.routes.connected(user_id)
+
+async def unregister_connection(sid, user_id):
+    """Drop a closed socket's outbox and, for its user's last socket, the route"""
+    sio.manager.outboxes.remove(sid)
+    sio.manager.set_encoding(sid, JSON)
+    if user_id is None:
+        return
+    await presence.disconnected(user_id)
+    if isinstance(sio.manager, NodeAwareRedisManager):
+        await sio.manager.routes.disconnected(user_id)
+
+async def _can_view_author(user_id, author_id) -> bool:
+    """Posts are visible to their author and the author's friends"""
+    if str(user_id) == str(author_id):
+        return True
+    return await friend_cache.is_friend(user_id, author_id)
+
+async def _author_audience(author_id):
+    """The author and the author's friends"""
+    friend_ids = await friend_cache.get_friend_ids(author_id)
+    return [author_id, *friend_ids]
+
+async def _emit_to_users(event, data, user_ids):
+    """
+    Emit to the users' rooms with a sequence number and keep the event for
+    replay, so a reconnecting client can catch up instead of refetching
+    """
+    seq = await replay_buffer.next_seq()
+    data = {**data, 'seq': seq}
+    await replay_buffer.record(user_ids, seq, event, data)
+    await sio.emit(event, data, to=[user_room(user_id) for user_id in user_ids])
+
+async def replay_missed_events(sid, user_id, last_seq):
+    """Send a reconnecting socket what it missed since last_seq in one message"""
+    entries = await replay_buffer.since(user_id, last_seq)
+    if entries is None:
+        await sio.emit(SocketEvents.RESYNC_REQUIRED, {'lastSeq': last_seq}, to=sid)
+    elif entries:
+        await sio.emit(SocketEvents.REPLAY, {
+            'events': [{'event': event, 'data': data} for _, event, data in entries]
+        }, to=sid)
 
 # Event handlers for post-related events
 async def emit_new_post(post_data):
-    """Notify all clients about a new post"""
-    await sio.emit(SocketEvents.NEW_POST, post_data)
+    """Notify the author's friends about a new post"""
+    author_id = post_data.get("user_id")
+    if author_id is None:
+        logger.warning("Dropping new_post event without user_id")
+        return
+    await _emit_to_users(SocketEvents.NEW_POST, post_data, await _author_audience(author_id))
 
-async def emit_post_liked(post_id, likes_count, user_id=None):
-    """Notify clients that a post has been liked"""
+async def emit_post_liked(post_id, likes_count, user_id=None, author_id=None, is_private=True):
+    """
+    Notify the sockets subscribed to the post of its new like count, after a
+    like or an unlike. Whether the recipient has liked the post is theirs to
+    track, so userHasLiked is not sent.
+    """
+    if author_id is None:
+        logger.warning(f"Dropping post_liked event for post {post_id} without author_id")
+        return
     data = {
         'postId': post_id,
-        'likes': likes_count,
-        'userHasLiked': True
+        'likes': likes_count
     }
-    await sio.emit(SocketEvents.POST_LIKED, data)
+    await sio.emit(SocketEvents.POST_LIKED, data, room=_post_event_room(post_id, author_id, is_private))
 
-async def emit_new_comment(post_id, comment_data):
-    """Notify clients about a new comment"""
+async def emit_new_comment(post_id, comment_data, author_id=None, is_private=True, comment_count=1):
+    """Notify the sockets subscribed to the post about a new comment"""
+    if author_id is None:
+        logger.warning(f"Dropping new_comment event for post {post_id} without author_id")
+        return
     data = {
         'postId': post_id,
         'comment': comment_data
     }
-    await sio.emit(SocketEvents.NEW_COMMENT, data)
+    if comment_count > 1:
+        # Several comments were coalesced - this is the newest one
+        data['newComments'] = comment_count
+    await sio.emit(SocketEvents.NEW_COMMENT, data, room=_post_event_room(post_id, author_id, is_private))
 
 # Event handlers for friendship-related events
 async def emit_new_friend_request(requester_id, addressee_id):
     """Notify a user about a new friend request"""
-    # Find the socket ID of the addressee user
-    await sio.emit(SocketEvents.NEW_FRIEND_REQUEST, {
+    await _emit_to_users(SocketEvents.NEW_FRIEND_REQUEST, {
         'requesterId': requester_id
-    }, room=addressee_id)
+    }, [addressee_id])
 
 async def emit_friend_request_accepted(addressee_id, requester_id):
     """Notify a user that their friend request was accepted"""
-    # Find the socket ID of the requester user
-    await sio.emit(SocketEvents.FRIEND_REQUEST_ACCEPTED, {
+    await _emit_to_users(SocketEvents.FRIEND_REQUEST_ACCEPTED, {
         'addresseeId': addressee_id
-    }, room=requester_id)
+    }, [requester_id])
+
+# Likes and comments are buffered per post and flushed on an interval
+coalescer = EventCoalescer(
+    interval=settings.EVENT_COALESCE_INTERVAL_MS / 1000,
+    emit_likes=emit_post_liked,
+    emit_comments=emit_new_comment,
+)
 
 # API endpoints for other services to trigger WebSocket events
 async def handle_post_event(event_type, data):
     """Handle post-related events from other services"""
     if event_type == "new_post":
         await emit_new_post(data)
-    elif event_type == "post_liked":
-        await emit_post_liked(data["post_id"], data["likes_count"])
-    elif event_type == "new_comment":
-        await emit_new_comment(data["post_id"], data["comment"])
+    elif event_type in ("post_liked", "new_comment"):
+        # Events from publishers that don't send is_private are treated as private
+        target = {"author_id": data.get("author_id"), "is_private": data.get("is_private", True)}
+        if event_type == "post_liked":
+            if coalescer.enabled:
+                coalescer.add_like(data["post_id"], data["likes_count"], target)
+            else:
+                await emit_post_liked(data["post_id"], data["likes_count"], **target)
+        elif coalescer.enabled:
+            coalescer.add_comment(data["post_id"], data["comment"], target)
+        else:
+            await emit_new_comment(data["post_id"], data["comment"], **target)
 
 async def handle_friendship_event(event_type, data):
     """Handle friendship-related events from other services"""
@@ -80,21 +205,87 @@ async def handle_friendship_event(event_type, data):
     elif event_type == "friend_request_accepted":
         await emit_friend_request_accepted(data["addressee_id"], data["requester_id"])
 
+# Post subscriptions - clients subscribe to the posts currently on screen
+@sio.event
+async def subscribe_posts(sid, data):
+    """
+    Subscribe to the given posts, each as {"postId": ..., "authorId": ...}.
+    Every subscriber joins the post's open room, which carries events of
+    public posts; the author and the author's friends also join its private
+    room. Posts beyond POST_SUBSCRIPTIONS_MAX are rejected.
+    """
+    session = await sio.get_session(sid)
+    rooms = set(sio.rooms(sid))
+    current = sum(1 for room in rooms if room.startswith("post:") and room.count(":") == 1)
+    subscribed, rejected = [], []
+    for post in (data or {}).get("posts", []):
+        post_id, author_id = post.get("postId"), post.get("authorId")
+        if post_id is None:
+            rejected.append({"postId": post_id, "reason": "missing postId"})
+            continue
+        if post_room(post_id) not in rooms:
+            if current >= settings.POST_SUBSCRIPTIONS_MAX:
+                rejected.append({"postId": post_id, "reason": "subscription limit reached"})
+                continue
+            await sio.enter_room(sid, post_room(post_id))
+            rooms.add(post_room(post_id))
+            current += 1
+        if await _can_view_author(session["user_id"], author_id):
+            await sio.enter_room(sid, private_post_room(author_id, post_id))
+        subscribed.append(post_id)
+    return {"subscribed": subscribed, "rejected": rejected}
+
+@sio.event
+async def unsubscribe_posts(sid, data):
+    """Leave the rooms of the given posts"""
+    for post in (data or {}).get("posts", []):
+        await sio.leave_room(sid, post_room(post.get("postId")))
+        await sio.leave_room(sid, private_post_room(post.get("authorId"), post.get("postId")))
+    return {"ok": True}
+
+# Presence of friends, e.g. for the friend list
+@sio.event
+async def get_presence(sid, data):
+    """Online state of the given users; ids that aren't friends are left out"""
+    session = await sio.get_session(sid)
+    user_ids = (data or {}).get("userIds", [])[:settings.PRESENCE_QUERY_MAX]
+    allowed = [
+        user_id for user_id in user_ids
+        if isinstance(user_id, int) and await friend_cache.is_friend(session["user_id"], user_id)
+    ]
+    return {"presence": await presence.is_online(allowed)}
+
+async def _may_join(user_id, room) -> bool:
+    """Only the user's own room and rooms of posts they can see may be joined"""
+    if room == user_room(user_id):
+        return True
+    parts = room.split(":")
+    if len(parts) == 2 and parts[0] == "post":
+        return True
+    if len(parts) == 3 and parts[0] == "post":
+        return await _can_view_author(user_id, parts[1])
+    return False
+
 # User room management
 @sio.event
 async def join_room(sid, data):
     """Add user to a specific room for targeted notifications"""
     session = await sio.get_session(sid)
-    room = data.get("room")
-    if room:
-        sio.enter_room(sid, room)
-        print(f"User {session['user_id']} joined room {room}")
+    room = (data or {}).get("room")
+    if not room or not await _may_join(session["user_id"], room):
+        return {"ok": False, "error": "not allowed"}
+    await sio.enter_room(sid, room)
+    print(f"User {session['user_id']} joined room {room}")
+    return {"ok": True}
 
 @sio.event
 async def leave_room(sid, data):
     """Remove user from a specific room"""
     session = await sio.get_session(sid)
-    room = data.get("room")
-    if room:
-        sio.leave_room(sid, room)
-        print(f"User {session['user_id']} left room {room}")
\ No newline at end of file
+    room = (data or {}).get("room")
+    # Leaving their own room would silently cut a user off from notifications
+    if not room or room == user_room(session["user_id"]):
+        return {"ok": False, "error": "not allowed"}
+    await sio.leave_room(sid, room)
+    print(f"User {session['user_id']} left room {room}")
+    return {"ok": True}
@@ -0,0 +1,299 @@
+"""
+Load test for the websocket service.
+
+Connects N socket.io clients with test JWTs, injects events through
+POST /internal/events and reports connect rate, end-to-end delivery latency
+percentiles, memory per connection and dropped messages.
+
+Each injected event is a new_friend_request to one simulated user, which
+the service delivers to every socket of that user without calling any other
+service; the event's requester_id carries the message number so deliveries
+can be matched to their send time. --sockets-per-user sets the fan-out.
+
+Run from server/websocket-service (pip install -r bench/requirements.txt):
+
+    # against a node that is already running (admission limits raised!)
+    python -m bench.socket_load --url http://localhost:8000 --clients 2000
+
+    # spawn two local nodes with Redis and node-aware routing
+    python -m bench.socket_load --spawn 2 --redis-url redis://localhost:6379/0 \\
+        --clients 10000 --sockets-per-user 2 --events 20000 --rate 2000
+
+10k+ sockets from one process need a high open-file limit (ulimit -n).
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import httpx
+import socketio
+from jose import jwt
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Results:
+    def __init__(self):
+        self.connected = 0
+        self.connect_failures: Counter = Counter()
+        self.connect_seconds = 0.0
+        # user id -> sockets of that user that connected
+        self.sockets_per_user: Counter = Counter()
+        self.sent_at: Dict[int, float] = {}
+        self.latencies: List[float] = []
+        self.expected = 0
+        self.received = 0
+        self.memory_before: Optional[int] = None
+        self.memory_after: Optional[int] = None
+
+
+def make_token(user_id: int, secret: str) -> str:
+    return jwt.encode(
+        {"sub": str(user_id), "username": f"bench{user_id}", "exp": int(time.time()) + 3600},
+        secret,
+        algorithm="HS256",
+    )
+
+
+def rss_bytes(pids: List[int]) -> Optional[int]:
+    """Resident memory of the given processes, from /proc (Linux only)"""
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+        except OSError:
+            return None
+    return total
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def spawn_nodes(args) -> List[subprocess.Popen]:
+    """Start --spawn uvicorn nodes with admission limits out of the way"""
+    env = dict(
+        os.environ,
+        SECRET_KEY=args.secret,
+        INTERNAL_API_KEY=args.internal_key,
+        ADMISSION_MAX_CONNECTIONS=str(args.clients * 2),
+        ADMISSION_IP_RATE="1000000",
+        ADMISSION_IP_BURST="1000000",
+        ADMISSION_MAX_SOCKETS_PER_USER=str(args.sockets_per_user),
+        ADMISSION_USER_BURST=str(args.sockets_per_user * 2),
+        SOCKET_QUEUE_MAX_SIZE=str(max(256, args.events)),
+        SOCKET_QUEUE_HIGH_WATER=str(max(192, args.events)),
+    )
+    if args.redis_url:
+        env.update(USE_REDIS="true", NODE_ROUTING_ENABLED="true", REDIS_URL=args.redis_url)
+
+    nodes = []
+    for index in range(args.spawn):
+        nodes.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.base_port + index), "--log-level", "warning"],
+            cwd=SERVICE_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+        ))
+    return nodes
+
+
+async def wait_until_ready(urls: List[str], timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        for url in urls:
+            while True:
+                try:
+                    if (await client.get(f"{url}/")).status_code == 200:
+                        break
+                except httpx.RequestError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"{url} did not come up")
+                await asyncio.sleep(0.2)
+
+
+def decode_payload(payload) -> dict:
+    if isinstance(payload, (bytes, bytearray)):
+        # new_friend_request schema: (seq, requesterId)
+        return {"requesterId": msgpack.unpackb(payload)[1]}
+    return payload
+
+
+async def connect_clients(args, urls: List[str], results: Results) -> List[socketio.AsyncClient]:
+    semaphore = asyncio.Semaphore(args.connect_concurrency)
+    clients: List[socketio.AsyncClient] = []
+
+    def on_friend_request(payload):
+        data = decode_payload(payload)
+        sent_at = results.sent_at.get(data.get("requesterId"))
+        if sent_at is not None:
+            results.latencies.append(time.perf_counter() - sent_at)
+        results.received += 1
+
+    async def connect_one(index: int) -> None:
+        user_id = args.user_base + index // args.sockets_per_user
+        client = socketio.AsyncClient(reconnection=False)
+        client.on("new_friend_request", on_friend_request)
+        auth = {"token": make_token(user_id, args.secret)}
+        if args.encoding == "msgpack":
+            auth["encoding"] = "msgpack"
+        async with semaphore:
+            try:
+                await client.connect(
+                    urls[index % len(urls)],
+                    auth=auth,
+                    transports=["websocket"],
+                    socketio_path=args.socketio_path,
+                    wait_timeout=args.connect_timeout,
+                )
+            except Exception as e:
+                results.connect_failures[type(e).__name__ + (f": {e}" if str(e) else "")] += 1
+                return
+        results.connected += 1
+        results.sockets_per_user[user_id] += 1
+        clients.append(client)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(connect_one(index) for index in range(args.clients)))
+    results.connect_seconds = time.perf_counter() - started
+    return clients
+
+
+async def inject_events(args, urls: List[str], results: Results) -> None:
+    user_ids = sorted(results.sockets_per_user)
+    if not user_ids:
+        return
+    interval = args.batch_size / args.rate
+    headers = {"X-Internal-Key": args.internal_key}
+    async with httpx.AsyncClient(timeout=10) as client:
+        for batch_start in range(0, args.events, args.batch_size):
+            tick = time.perf_counter()
+            batch = []
+            for message in range(batch_start, min(batch_start + args.batch_size, args.events)):
+                user_id = user_ids[message % len(user_ids)]
+                batch.append({
+                    "type": "new_friend_request",
+                    "data": {"requester_id": message, "addressee_id": user_id},
+                })
+                results.expected += results.sockets_per_user[user_id]
+                results.sent_at[message] = time.perf_counter()
+            url = urls[(batch_start // args.batch_size) % len(urls)]
+            response = await client.post(f"{url}/internal/events", json=batch, headers=headers)
+            if response.status_code != 202:
+                # Rejected batches are reported as dropped deliveries
+                print(f"batch at {batch_start} rejected: {response.status_code} {response.text}", file=sys.stderr)
+            await asyncio.sleep(max(0.0, interval - (time.perf_counter() - tick)))
+
+
+async def run(args) -> Results:
+    results = Results()
+    nodes = spawn_nodes(args) if args.spawn else []
+    urls = [f"http://127.0.0.1:{args.base_port + index}" for index in range(args.spawn)] if nodes else args.url
+    pids = [node.pid for node in nodes] or args.server_pid
+    clients: List[socketio.AsyncClient] = []
+    try:
+        await wait_until_ready(urls)
+        results.memory_before = rss_bytes(pids) if pids else None
+        clients = await connect_clients(args, urls, results)
+        results.memory_after = rss_bytes(pids) if pids else None
+
+        await inject_events(args, urls, results)
+        deadline = time.monotonic() + args.drain_timeout
+        while results.received < results.expected and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+    finally:
+        await asyncio.gather(*(client.disconnect() for client in clients), return_exceptions=True)
+        for node in nodes:
+            node.terminate()
+        for node in nodes:
+            node.wait()
+    return results
+
+
+def report(args, results: Results) -> dict:
+    latencies = sorted(results.latencies)
+    memory_per_connection = None
+    if results.memory_before is not None and results.memory_after is not None and results.connected:
+        memory_per_connection = (results.memory_after - results.memory_before) / results.connected
+    return {
+        "clients": args.clients,
+        "connected": results.connected,
+        "connect_failures": dict(results.connect_failures),
+        "connects_per_second": round(results.connected / results.connect_seconds, 1) if results.connect_seconds else None,
+        "memory_per_connection_kib": round(memory_per_connection / 1024, 1) if memory_per_connection is not None else None,
+        "events": args.events,
+        "expected_deliveries": results.expected,
+        "received": results.received,
+        "dropped": max(0, results.expected - results.received),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 2),
+            "p90": round(percentile(latencies, 0.90) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        },
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Socket fan-out load test for the websocket service")
+    parser.add_argument("--url", action="append", help="Running node to test (repeatable); default http://localhost:8000")
+    parser.add_argument("--spawn", type=int, default=0, help="Start this many local nodes instead of using --url")
+    parser.add_argument("--base-port", type=int, default=8100, help="First port of spawned nodes")
+    parser.add_argument("--redis-url", help="Run spawned nodes with Redis and node-aware routing")
+    parser.add_argument("--server-pid", type=int, action="append", help="PID of a running node, for memory numbers")
+    parser.add_argument("--socketio-path", default="ws/socket.io")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--sockets-per-user", type=int, default=1)
+    parser.add_argument("--user-base", type=int, default=1_000_000, help="First simulated user id")
+    parser.add_argument("--connect-concurrency", type=int, default=200)
+    parser.add_argument("--connect-timeout", type=float, default=10)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--rate", type=float, default=1000, help="Events per second")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--drain-timeout", type=float, default=30)
+    parser.add_argument("--encoding", choices=["json", "msgpack"], default="json")
+    parser.add_argument("--secret", default=os.getenv("SECRET_KEY", "your-secret-key-for-jwt-here-please-change-in-production"))
+    parser.add_argument("--internal-key", default=os.getenv("INTERNAL_API_KEY", "internal-api-key-please-change-in-production"))
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON only")
+    args = parser.parse_args(argv)
+    args.url = args.url or ["http://localhost:8000"]
+    if args.encoding == "msgpack" and msgpack is None:
+        parser.error("--encoding msgpack needs the msgpack package")
+    return args
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    # Every socket is a file descriptor
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    summary = report(args, asyncio.run(run(args)))
+    if args.json:
+        print(json.dumps(summary))
+        return
+    for key, value in summary.items():
+        print(f"{key:>28}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+from app.main import _refuse
+from app.services.admission import AdmissionRejected
+
+
+def test_refusal_carries_retry_hint_as_error_data():
+    error = _refuse(AdmissionRejected("Server is at capacity", 2.5))
+    # Sent to the client as connect_error {message, data}
+    assert error.error_args == {
+        "message": "Server is at capacity",
+        "data": {"retryAfter": 2.5},
+    }
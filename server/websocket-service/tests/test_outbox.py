@@ -0,0 +1,114 @@
+import asyncio
+
+from app.services.outbox import OutboxRegistry
+
+
+class FakeEioSocket:
+    class queue:
+        @staticmethod
+        def qsize():
+            return 0
+
+
+class FakeServer:
+    def __init__(self):
+        self.eio = type("Eio", (), {"sockets": {"eio1": FakeEioSocket()}})()
+        self.disconnected = []
+        self.sent = []
+
+    async def disconnect(self, sid):
+        self.disconnected.append(sid)
+
+    async def _send_eio_packet(self, eio_sid, pkt):
+        self.sent.append(pkt)
+
+
+class FakeManager:
+    def __init__(self):
+        self.server = FakeServer()
+
+
+def make_registry(max_size=3):
+    registry = OutboxRegistry(FakeManager())
+    registry.max_size = max_size
+    registry.high_water = max_size + 1
+    # Transport always "full", so entries stay queued for inspection
+    registry.transport_limit = 0
+    return registry
+
+
+def queued_events(registry, sid="s1"):
+    return [entry[1][0] for entry in registry.outboxes[sid].entries]
+
+
+def run(scenario):
+    async def main():
+        registry = await scenario()
+        # Stop the drain tasks held back by the "full" transport
+        for outbox in registry.outboxes.values():
+            if outbox.drain_task is not None:
+                outbox.drain_task.cancel()
+        return registry
+
+    return asyncio.run(main())
+
+
+def test_post_liked_merges_by_post():
+    async def scenario():
+        registry = make_registry()
+        registry.enqueue("s1", "eio1", "post_liked", [{"postId": 1, "likes": 1}], ["like1"])
+        registry.enqueue("s1", "eio1", "post_liked", [{"postId": 1, "likes": 2}], ["like2"])
+        return registry
+
+    registry = run(scenario)
+    assert queued_events(registry) == ["like2"]
+    assert registry.merged == 1
+
+
+def test_full_outbox_drops_oldest_event_without_seq():
+    async def scenario():
+        registry = make_registry()
+        registry.enqueue("s1", "eio1", "new_friend_request", [{"seq": 1}], ["seq1"])
+        registry.enqueue("s1", "eio1", "new_comment", [{"postId": 1}], ["comment1"])
+        registry.enqueue("s1", "eio1", "new_friend_request", [{"seq": 2}], ["seq2"])
+        registry.enqueue("s1", "eio1", "new_comment", [{"postId": 2}], ["comment2"])
+        return registry
+
+    registry = run(scenario)
+    assert queued_events(registry) == ["seq1", "seq2", "comment2"]
+    assert registry.dropped == 1
+    assert registry.evicted == 0
+
+
+def test_full_outbox_of_seq_events_evicts_instead_of_dropping():
+    async def scenario():
+        registry = make_registry(max_size=2)
+        for seq in (1, 2, 3):
+            registry.enqueue("s1", "eio1", "new_friend_request", [{"seq": seq}], [f"seq{seq}"])
+        # Nothing may reach an evicted socket before it is gone
+        registry.enqueue("s1", "eio1", "new_friend_request", [{"seq": 4}], ["seq4"])
+        await asyncio.sleep(0)
+        return registry
+
+    registry = run(scenario)
+    assert registry.dropped == 0
+    assert registry.evicted == 1
+    assert "s1" not in registry.outboxes
+    assert registry.manager.server.disconnected == ["s1"]
+
+    # Once the disconnect is processed the sid may be reused
+    registry.remove("s1")
+    assert "s1" not in registry._evicting
+
+
+def test_full_outbox_keeps_replay_batches():
+    async def scenario():
+        registry = make_registry(max_size=2)
+        registry.enqueue("s1", "eio1", "replay", [{"events": []}], ["replay"])
+        registry.enqueue("s1", "eio1", "new_comment", [{"postId": 1}], ["comment1"])
+        registry.enqueue("s1", "eio1", "new_comment", [{"postId": 2}], ["comment2"])
+        return registry
+
+    registry = run(scenario)
+    assert queued_events(registry) == ["replay", "comment2"]
+    assert registry.dropped == 1
@@ -0,0 +1,77 @@
+import asyncio
+
+from app.services.replay import ReplayBuffer
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _record(buffer, user_id, event="new_friend_request"):
+    seq = await buffer.next_seq()
+    await buffer.record([user_id], seq, event, {"seq": seq})
+    return seq
+
+
+def test_since_returns_events_after_last_seq():
+    async def scenario():
+        buffer = ReplayBuffer(size=10, max_users=10)
+        first = await _record(buffer, "A")
+        second = await _record(buffer, "A")
+        return first, second, await buffer.since("A", first)
+
+    first, second, entries = run(scenario())
+    assert [entry[0] for entry in entries] == [second]
+
+
+def test_ring_overflow_requires_resync():
+    async def scenario():
+        buffer = ReplayBuffer(size=2, max_users=10)
+        first = await _record(buffer, "A")
+        for _ in range(3):
+            await _record(buffer, "A")
+        return await buffer.since("A", first)
+
+    assert run(scenario()) is None
+
+
+def test_recreated_ring_after_eviction_requires_resync():
+    async def scenario():
+        buffer = ReplayBuffer(size=10, max_users=1)
+        evicted_seq = await _record(buffer, "A")
+        # Recording for B evicts A's ring
+        await _record(buffer, "B")
+        await _record(buffer, "A")
+        return await buffer.since("A", evicted_seq - 1)
+
+    # A's event at evicted_seq is gone, so a replay would hide the gap
+    assert run(scenario()) is None
+
+
+def test_recreated_ring_replays_events_after_the_evicted_ones():
+    async def scenario():
+        buffer = ReplayBuffer(size=10, max_users=1)
+        evicted_seq = await _record(buffer, "A")
+        await _record(buffer, "B")
+        newer = await _record(buffer, "A")
+        return newer, await buffer.since("A", evicted_seq)
+
+    newer, entries = run(scenario())
+    assert [entry[0] for entry in entries] == [newer]
+
+
+def test_unknown_user_after_restart_requires_resync():
+    buffer = ReplayBuffer(size=10, max_users=10)
+    assert run(buffer.since("A", buffer.started_seq - 1)) is None
+    assert run(buffer.since("A", buffer.started_seq)) == []
+
+
+def test_last_seq_ahead_of_the_clock_requires_resync():
+    async def scenario():
+        buffer = ReplayBuffer(size=10, max_users=10)
+        seq = await _record(buffer, "A")
+        return await buffer.since("A", seq), await buffer.since("A", seq + 1000)
+
+    current, ahead = run(scenario())
+    assert current == []
+    assert ahead is None